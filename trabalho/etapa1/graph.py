@@ -1,5 +1,8 @@
+import heapq
+import random
 import re
 from collections import defaultdict
+import numpy as np
 import pandas as pd
 
 # Função para ler e interpretar os dados da instância
@@ -122,52 +125,128 @@ class CustomGraphFinal:
         return min(degree.values()), max(degree.values())
 
     def floyd_warshall(self):
-        n = max(self.V) + 1
-        INF = float('inf')
-        dist = [[INF]*n for _ in range(n)]
-        pred = [[-1]*n for _ in range(n)]
-        for u in self.V:
-            dist[u][u] = 0
-            pred[u][u] = u
+        # Mapeamento denso dos vértices (0..n-1): funciona com IDs esparsos e
+        # evita dimensionar as matrizes por max(self.V) + 1.
+        nodes = sorted(self.V)
+        self.node_to_index = {v: i for i, v in enumerate(nodes)}
+        self.index_to_node = nodes
+        n = len(nodes)
+
+        dist = np.full((n, n), np.inf)
+        pred = np.full((n, n), -1, dtype=np.int64)
+        np.fill_diagonal(dist, 0)
+        pred[np.arange(n), np.arange(n)] = np.arange(n)
         for u in self.graph:
+            i = self.node_to_index[u]
             for v, cost in self.graph[u]:
-                dist[u][v] = min(dist[u][v], cost)
-                pred[u][v] = u
-        for k in self.V:
-            for i in self.V:
-                for j in self.V:
-                    if dist[i][k] + dist[k][j] < dist[i][j]:
-                        dist[i][j] = dist[i][k] + dist[k][j]
-                        pred[i][j] = pred[k][j]
+                j = self.node_to_index[v]
+                if cost < dist[i, j]:
+                    dist[i, j] = cost
+                    pred[i, j] = i
+
+        # Cada passo k relaxa a matriz inteira de uma vez: dist[i][k] + dist[k][j]
+        # é obtido por broadcasting da coluna k com a linha k.
+        for k in range(n):
+            via_k = dist[:, k, None] + dist[None, k, :]
+            melhora = via_k < dist
+            np.minimum(dist, via_k, out=dist)
+            pred = np.where(melhora, pred[k][None, :], pred)
         return dist, pred
 
     def average_path_length_and_diameter(self, dist):
-        values = [dist[i][j] for i in self.V for j in self.V if i != j and dist[i][j] < float('inf')]
-        return (sum(values) / len(values), max(values)) if values else (float('inf'), float('inf'))
+        dist = np.asarray(dist)
+        values = dist[~np.eye(len(dist), dtype=bool) & np.isfinite(dist)]
+        return (float(values.mean()), float(values.max())) if values.size else (float('inf'), float('inf'))
 
     def connected_components(self):
+        # Componentes fracamente conexas: os arcos são percorridos nos dois sentidos.
+        # DFS iterativa (pilha explícita), para não atingir o limite de recursão em
+        # grafos grandes.
+        vizinhos = defaultdict(list)
+        for u in self.graph:
+            for v, _ in self.graph[u]:
+                vizinhos[u].append(v)
+                vizinhos[v].append(u)
+
         visited = set()
         components = []
-        def dfs(v, comp):
-            visited.add(v)
-            comp.append(v)
-            for u, _ in self.graph[v]:
-                if u not in visited:
-                    dfs(u, comp)
-        for v in self.V:
-            if v not in visited:
-                comp = []
-                dfs(v, comp)
-                components.append(comp)
+        for origem in sorted(self.V):
+            if origem in visited:
+                continue
+            visited.add(origem)
+            comp = []
+            pilha = [origem]
+            while pilha:
+                v = pilha.pop()
+                comp.append(v)
+                for u in vizinhos[v]:
+                    if u not in visited:
+                        visited.add(u)
+                        pilha.append(u)
+            components.append(comp)
         return components
 
     def betweenness_centrality(self, dist, pred):
+        # 'pred' usa os índices densos de 'floyd_warshall'.
         bt = {v: 0 for v in self.V}
-        for s in self.V:
-            for t in self.V:
+        n = len(self.index_to_node)
+        for s in range(n):
+            for t in range(n):
                 if s != t and pred[s][t] != -1:
                     v = pred[s][t]
                     while v != s and v != -1:
-                        bt[v] += 1
+                        bt[self.index_to_node[v]] += 1
                         v = pred[s][v]
-        return bt
\ No newline at end of file
+        return bt
+
+    def betweenness_brandes(self, amostras=None, semente=None):
+        # Algoritmo de Brandes ponderado: O(n·m log n), trabalha sobre a lista de
+        # adjacência (sem a matriz 'pred') e conta todos os caminhos mínimos de cada par.
+        # Com 'amostras', usa só essa quantidade de origens e reescala o resultado.
+        if amostras is not None and amostras < 1:
+            raise ValueError(f"O número de amostras tem de ser pelo menos 1 (recebido: {amostras}).")
+        nodes = list(self.V)
+        if amostras is not None and amostras < len(nodes):
+            origens = random.Random(semente).sample(sorted(nodes), amostras)
+        else:
+            origens = nodes
+
+        bt = {v: 0.0 for v in nodes}
+        for s in origens:
+            dist = {s: 0}
+            sigma = dict.fromkeys(nodes, 0)
+            sigma[s] = 1
+            predecessores = {v: [] for v in nodes}
+            fechado = set()
+            pilha = []
+            pq = [(0, s)]
+            while pq:
+                d, u = heapq.heappop(pq)
+                if u in fechado:
+                    continue
+                fechado.add(u)
+                pilha.append(u)
+                for v, cost in self.graph[u]:
+                    nova = d + cost
+                    if nova < dist.get(v, float('inf')):
+                        dist[v] = nova
+                        sigma[v] = sigma[u]
+                        predecessores[v] = [u]
+                        heapq.heappush(pq, (nova, v))
+                    elif nova == dist[v] and v not in fechado:
+                        sigma[v] += sigma[u]
+                        predecessores[v].append(u)
+
+            # Acumula as dependências na ordem inversa de fecho do Dijkstra.
+            delta = dict.fromkeys(pilha, 0.0)
+            for w in reversed(pilha):
+                coeficiente = (1.0 + delta[w]) / sigma[w]
+                for v in predecessores[w]:
+                    delta[v] += sigma[v] * coeficiente
+                if w != s:
+                    bt[w] += delta[w]
+
+        if len(origens) < len(nodes):
+            escala = len(nodes) / len(origens)
+            bt = {v: c * escala for v, c in bt.items()}
+        return bt
@@ -0,0 +1,255 @@
+# ARQUIVO: benchmark.py
+"""
+Benchmark de desempenho sobre instâncias representativas de cada família MCGRP.
+
+Mede separadamente o tempo de cada fase do pipeline (leitura, grafo, caminhos
+mínimos, construtivo e busca local), calcula o gap de custo em relação a
+'dados/reference_values.csv' e guarda os resultados em JSON. Com '--comparar', os
+resultados são confrontados com um baseline guardado anteriormente e o processo
+termina com código 1 se algum tempo ou gap piorar além da tolerância.
+
+Exemplos:
+    python benchmark.py --guardar baseline.json
+    python benchmark.py --comparar baseline.json --tolerancia-tempo 0.25 --tolerancia-gap 0.5
+"""
+
+# Imports necessários
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from instancia import parse_instance
+from grafo import CustomGraph
+from solucao import TabelaServicos, preparar_servicos, construtivo_guloso_vizinho_mais_proximo, construtivo_split
+from otimizacao import swap_entre_rotas, vnd
+
+# Instâncias representativas (uma média e a maior) de cada família.
+FAMILIAS = {
+    'BHW': ['BHW15', 'BHW16'],
+    'CBMix': ['CBMix20', 'CBMix19'],
+    'DI-NEARP': ['DI-NEARP-n442-Q8k', 'DI-NEARP-n833-Q16k'],
+    'mggdb': ['mggdb_0.45_16', 'mggdb_0.50_9'],
+    'mgval': ['mgval_0.50_7C', 'mgval_0.45_10A'],
+}
+FASES = ('leitura', 'grafo', 'caminhos', 'construtivo', 'busca_local')
+
+
+def familia_da_instancia(nome):
+    """ Retorna a família de uma instância a partir do prefixo do nome (ou None). """
+    for familia in sorted(FAMILIAS, key=len, reverse=True):
+        if nome.startswith(familia):
+            return familia
+    return None
+
+
+def ler_valores_referencia(caminho):
+    """
+    Lê 'reference_values.csv' (colunas Nome, Solucao, #Rotas, clocks, clocks_melhor_sol).
+
+    Returns:
+        dict: Nome da instância -> {'custo', 'rotas', 'clocks', 'clocks_melhor_sol'}.
+    """
+    referencias = {}
+    with open(caminho, 'r') as f:
+        next(f)  # cabeçalho
+        for linha in f:
+            campos = [c.strip() for c in linha.split(',')]
+            if len(campos) < 5 or not campos[0]:
+                continue
+            referencias[campos[0]] = {
+                'custo': float(campos[1]),
+                'rotas': int(campos[2]),
+                'clocks': int(campos[3]),
+                'clocks_melhor_sol': int(campos[4]),
+            }
+    return referencias
+
+
+def medir_instancia(filepath, construtivo='guloso', busca='swap', apenas_terminais=False):
+    """
+    Executa o pipeline numa instância, cronometrando cada fase separadamente.
+
+    Returns:
+        tuple: (tempos, solucao), com 'tempos' a mapear cada fase de 'FASES' para a sua
+        duração em segundos.
+    """
+    tempos = {}
+
+    t = time.perf_counter()
+    parsed_data = parse_instance(filepath)
+    tempos['leitura'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    g = CustomGraph(parsed_data)
+    tempos['grafo'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    dist, _, node_to_index, _ = g.all_pairs_dijkstra(apenas_terminais=apenas_terminais)
+    tempos['caminhos'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    servicos_info = TabelaServicos(preparar_servicos(parsed_data), node_to_index)
+    if construtivo == 'split':
+        solucao = construtivo_split(g, servicos_info, dist, node_to_index)
+    else:
+        solucao = construtivo_guloso_vizinho_mais_proximo(g, servicos_info, dist, node_to_index)
+    tempos['construtivo'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    if busca == 'vnd':
+        solucao = vnd(solucao, g, servicos_info, dist, node_to_index)
+    else:
+        solucao = swap_entre_rotas(solucao, g, servicos_info, dist, node_to_index)
+    tempos['busca_local'] = time.perf_counter() - t
+
+    return tempos, solucao
+
+
+def executar_benchmark(input_dir, instancias, referencias, repeticoes=3, **opcoes):
+    """
+    Mede cada instância 'repeticoes' vezes e guarda, por fase, o menor tempo observado
+    (o menos afetado por ruído da máquina). 'opcoes' são repassadas a 'medir_instancia'.
+
+    Returns:
+        dict: Resultados no formato guardado em JSON (ver 'main').
+    """
+    resultados = {}
+    for nome in instancias:
+        filepath = os.path.join(input_dir, f'{nome}.dat')
+        melhores = None
+        for _ in range(repeticoes):
+            tempos, solucao = medir_instancia(filepath, **opcoes)
+            melhores = tempos if melhores is None else {f: min(melhores[f], tempos[f]) for f in FASES}
+
+        referencia = referencias.get(nome)
+        gap = None
+        if referencia and referencia['custo'] > 0:
+            gap = (solucao.custo_total - referencia['custo']) / referencia['custo'] * 100
+        resultados[nome] = {
+            'familia': familia_da_instancia(nome),
+            'tempos': melhores,
+            'tempo_total': sum(melhores.values()),
+            'custo': solucao.custo_total,
+            'rotas': len(solucao.rotas),
+            'referencia': referencia['custo'] if referencia else None,
+            'gap': gap,
+        }
+        gap_txt = f'{gap:+.2f}%' if gap is not None else 's/ ref.'
+        print(f"{nome:<22} custo {solucao.custo_total:>10.0f}  gap {gap_txt:>9}  " +
+              '  '.join(f'{f} {melhores[f] * 1000:.1f}ms' for f in FASES))
+    return resultados
+
+
+def agregar_familias(resultados):
+    """ Soma os tempos por fase e calcula o gap médio de cada família. """
+    familias = {}
+    for dados in resultados.values():
+        agregado = familias.setdefault(dados['familia'], {'instancias': 0, 'tempos': dict.fromkeys(FASES, 0.0), 'gaps': []})
+        agregado['instancias'] += 1
+        for fase in FASES:
+            agregado['tempos'][fase] += dados['tempos'][fase]
+        if dados['gap'] is not None:
+            agregado['gaps'].append(dados['gap'])
+    for agregado in familias.values():
+        gaps = agregado.pop('gaps')
+        agregado['gap_medio'] = sum(gaps) / len(gaps) if gaps else None
+    return familias
+
+
+def comparar_com_baseline(atual, baseline, tolerancia_tempo=0.25, tolerancia_gap=0.5, tempo_minimo=0.005):
+    """
+    Compara os resultados atuais com um baseline.
+
+    Um tempo regride quando excede o do baseline em mais de 'tolerancia_tempo' (fração)
+    e a diferença absoluta passa 'tempo_minimo' segundos (fases muito curtas são
+    dominadas por ruído). Um gap regride quando sobe mais de 'tolerancia_gap' pontos
+    percentuais.
+
+    Returns:
+        list[str]: Descrição de cada regressão encontrada (vazia se não houver).
+    """
+    regressoes = []
+    for nome, dados in atual['instancias'].items():
+        base = baseline['instancias'].get(nome)
+        if base is None:
+            continue
+        for fase in FASES:
+            t_atual, t_base = dados['tempos'][fase], base['tempos'][fase]
+            if t_atual > t_base * (1 + tolerancia_tempo) and t_atual - t_base > tempo_minimo:
+                regressoes.append(f"{nome}: tempo de '{fase}' passou de {t_base * 1000:.1f}ms para {t_atual * 1000:.1f}ms")
+        if dados['gap'] is not None and base['gap'] is not None and dados['gap'] > base['gap'] + tolerancia_gap:
+            regressoes.append(f"{nome}: gap passou de {base['gap']:.2f}% para {dados['gap']:.2f}%")
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de tempo e qualidade por família de instâncias.')
+    parser.add_argument('--entrada', default='dados/MCGRP', help='Pasta com as instâncias (.dat).')
+    parser.add_argument('--referencia', default='dados/reference_values.csv', help='CSV com os valores de referência.')
+    parser.add_argument('--familia', action='append', choices=sorted(FAMILIAS),
+                        help='Restringe o benchmark a uma família (pode ser repetido).')
+    parser.add_argument('--instancias', nargs='+', default=None, help='Lista explícita de instâncias (sem .dat).')
+    parser.add_argument('--repeticoes', type=int, default=3, help='Repetições por instância (guarda o menor tempo).')
+    parser.add_argument('--construtivo', choices=('guloso', 'split'), default='guloso')
+    parser.add_argument('--busca', choices=('swap', 'vnd'), default='swap')
+    parser.add_argument('--terminais', action='store_true', help='Calcula a matriz apenas entre os nós terminais.')
+    parser.add_argument('--guardar', default=None, metavar='JSON', help='Guarda os resultados neste ficheiro.')
+    parser.add_argument('--comparar', default=None, metavar='JSON', help='Baseline com que os resultados são comparados.')
+    parser.add_argument('--tolerancia-tempo', type=float, default=0.25, help='Aumento relativo de tempo tolerado (padrão: 0.25).')
+    parser.add_argument('--tolerancia-gap', type=float, default=0.5, help='Aumento de gap tolerado, em pontos percentuais.')
+    parser.add_argument('--tempo-minimo', type=float, default=0.005,
+                        help='Diferenças de tempo abaixo deste valor (s) nunca contam como regressão.')
+    args = parser.parse_args(argv)
+
+    if args.instancias:
+        instancias = args.instancias
+    else:
+        familias = args.familia or list(FAMILIAS)
+        instancias = [nome for familia in familias for nome in FAMILIAS[familia]]
+
+    configuracao = {'construtivo': args.construtivo, 'busca': args.busca, 'apenas_terminais': args.terminais}
+    referencias = ler_valores_referencia(args.referencia)
+    resultados = executar_benchmark(args.entrada, instancias, referencias, args.repeticoes, **configuracao)
+
+    relatorio = {
+        'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'configuracao': configuracao,
+        'repeticoes': args.repeticoes,
+        'instancias': resultados,
+        'familias': agregar_familias(resultados),
+    }
+
+    print()
+    for familia, agregado in relatorio['familias'].items():
+        gap = agregado['gap_medio']
+        gap_txt = f'gap médio {gap:+.2f}%' if gap is not None else 'sem referência'
+        print(f"{familia:<10} {agregado['instancias']} instâncias  {gap_txt}  " +
+              '  '.join(f'{f} {agregado["tempos"][f] * 1000:.1f}ms' for f in FASES))
+
+    if args.guardar:
+        with open(args.guardar, 'w') as f:
+            json.dump(relatorio, f, indent=2)
+        print(f'\nResultados guardados em {args.guardar}')
+
+    if args.comparar:
+        with open(args.comparar, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('configuracao') != configuracao:
+            print(f"Aviso: o baseline foi medido com outra configuração ({baseline.get('configuracao')}).")
+        regressoes = comparar_com_baseline(relatorio, baseline, args.tolerancia_tempo, args.tolerancia_gap, args.tempo_minimo)
+        if regressoes:
+            print(f'\n❌ {len(regressoes)} regressões em relação a {args.comparar}:')
+            for regressao in regressoes:
+                print(f'  - {regressao}')
+            return 1
+        print(f'\n✅ Sem regressões em relação a {args.comparar}.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
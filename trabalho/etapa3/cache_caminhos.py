@@ -0,0 +1,245 @@
+# ARQUIVO: cache_caminhos.py
+
+# Imports necessários
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from grafo import distancias_em_listas
+
+# O bloqueio do índice usa 'fcntl' (POSIX). Sem ele (Windows), o índice continua a ser
+# escrito atomicamente, mas sem exclusão mútua entre processos.
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Diretório padrão do cache (relativo à pasta de execução) e limite padrão de tamanho.
+DIRETORIO_CACHE_PADRAO = '.cache_caminhos'
+TAMANHO_MAXIMO_PADRAO = 2 * 1024 ** 3  # 2 GiB
+
+
+def hash_ficheiro(file_path):
+    """ Calcula o hash SHA-256 do conteúdo de um ficheiro de instância. """
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+class CacheCaminhos:
+    """
+    Cache persistente em disco das matrizes de caminhos mínimos de cada instância.
+
+    Cada entrada é identificada pelo hash do conteúdo do ficheiro '.dat' (e pelo modo,
+    completo ou apenas terminais), pelo que qualquer alteração na instância produz uma
+    chave nova. As matrizes de distância e de predecessores são guardadas como arrays
+    binários '.npy', junto da lista ordenada de nós que define o 'node_to_index', e são
+    lidas por mapeamento em memória nas execuções seguintes. Só com 'como_listas=False'
+    as matrizes ficam mapeadas durante a busca; por padrão ('como_listas=True', o
+    formato em que o construtivo e a busca local indexam mais depressa) são lidas por
+    inteiro para listas, e o ganho é apenas evitar o Dijkstra.
+
+    O tamanho total do cache é limitado: quando ultrapassa 'tamanho_maximo' bytes,
+    as entradas usadas há mais tempo são removidas (política LRU).
+    """
+    def __init__(self, diretorio=DIRETORIO_CACHE_PADRAO, tamanho_maximo=TAMANHO_MAXIMO_PADRAO):
+        self.diretorio = diretorio
+        self.tamanho_maximo = tamanho_maximo
+        os.makedirs(self.diretorio, exist_ok=True)
+
+    # --- Chaves e Índice ---
+
+    def _chave(self, hash_conteudo, apenas_terminais):
+        modo = 'terminais' if apenas_terminais else 'completa'
+        return f"{hash_conteudo}-{modo}"
+
+    def _pasta(self, chave):
+        return os.path.join(self.diretorio, chave)
+
+    def _caminho_indice(self):
+        return os.path.join(self.diretorio, 'indice.json')
+
+    @contextmanager
+    def _bloquear_indice(self):
+        """
+        Bloqueio exclusivo entre processos em torno da leitura-modificação-escrita do
+        índice (os trabalhadores do executor em lote partilham o mesmo cache).
+        """
+        with open(os.path.join(self.diretorio, '.indice.lock'), 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _ler_indice(self):
+        """ Lê o índice 'caminho da instância -> chaves', usado na invalidação. """
+        try:
+            with open(self._caminho_indice(), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _escrever_indice(self, indice):
+        """ Escreve o índice num ficheiro temporário próprio e substitui-o atomicamente. """
+        descritor, tmp = tempfile.mkstemp(dir=self.diretorio, prefix='.indice-', suffix='.tmp')
+        try:
+            with os.fdopen(descritor, 'w') as f:
+                json.dump(indice, f)
+            os.replace(tmp, self._caminho_indice())
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def _invalidar_antigas(self, file_path, chave):
+        """
+        Regista a chave atual da instância e remove as entradas que correspondiam a
+        versões anteriores do mesmo ficheiro.
+        """
+        caminho = os.path.abspath(file_path)
+        hash_atual = chave.rsplit('-', 1)[0]
+        with self._bloquear_indice():
+            indice = self._ler_indice()
+            chaves = indice.get(caminho, [])
+            for antiga in chaves:
+                if antiga.rsplit('-', 1)[0] != hash_atual:
+                    shutil.rmtree(self._pasta(antiga), ignore_errors=True)
+            chaves = [c for c in chaves if c.rsplit('-', 1)[0] == hash_atual]
+            if chave not in chaves:
+                chaves.append(chave)
+            indice[caminho] = chaves
+            self._escrever_indice(indice)
+
+    # --- Leitura e Escrita ---
+
+    def carregar(self, file_path, apenas_terminais=False, como_listas=True, hash_conteudo=None):
+        """
+        Tenta ler as matrizes da instância a partir do cache.
+
+        Returns:
+            tuple | None: (dist, pred, node_to_index, index_to_node) ou None se a
+            instância (nesta versão do ficheiro) ainda não estiver no cache. Com
+            'como_listas=False', 'dist' e 'pred' são devolvidos como arrays NumPy
+            mapeados em memória; caso contrário são lidos por inteiro e convertidos em
+            listas de listas (o formato esperado pelo construtivo e pela busca local),
+            com os mesmos tipos que 'all_pairs_dijkstra' devolve.
+        """
+        hash_conteudo = hash_conteudo or hash_ficheiro(file_path)
+        pasta = self._pasta(self._chave(hash_conteudo, apenas_terminais))
+        try:
+            dist = np.load(os.path.join(pasta, 'dist.npy'), mmap_mode='r')
+            pred = np.load(os.path.join(pasta, 'pred.npy'), mmap_mode='r')
+            nodes = np.load(os.path.join(pasta, 'nos.npy')).tolist()
+        except (OSError, ValueError):
+            return None
+
+        # Atualiza a data de acesso da entrada para a política de remoção LRU. Outro
+        # processo pode tê-la removido entretanto; as matrizes já estão abertas.
+        try:
+            os.utime(pasta, (time.time(), time.time()))
+        except FileNotFoundError:
+            pass
+
+        node_to_index = {node: i for i, node in enumerate(nodes)}
+        index_to_node = {i: node for i, node in enumerate(nodes)}
+        if como_listas:
+            dist, pred = distancias_em_listas(dist), pred.tolist()
+        return dist, pred, node_to_index, index_to_node
+
+    def guardar(self, file_path, dist, pred, node_to_index, apenas_terminais=False, hash_conteudo=None):
+        """ Guarda as matrizes de uma instância no cache e aplica a política de tamanho. """
+        hash_conteudo = hash_conteudo or hash_ficheiro(file_path)
+        chave = self._chave(hash_conteudo, apenas_terminais)
+        pasta = self._pasta(chave)
+
+        nodes = sorted(node_to_index, key=node_to_index.get)
+
+        # Escreve numa pasta temporária e só depois a move para o lugar definitivo,
+        # para que uma execução interrompida nunca deixe uma entrada incompleta. A chave
+        # depende só do conteúdo da instância: se outro processo já guardou a mesma
+        # entrada, as matrizes são iguais e a pasta temporária é descartada.
+        tmp = tempfile.mkdtemp(dir=self.diretorio, prefix='.tmp-')
+        try:
+            np.save(os.path.join(tmp, 'dist.npy'), np.asarray(dist, dtype=np.float64))
+            np.save(os.path.join(tmp, 'pred.npy'), np.asarray(pred, dtype=np.int32))
+            np.save(os.path.join(tmp, 'nos.npy'), np.asarray(nodes, dtype=np.int64))
+            with self._bloquear_indice():
+                if not os.path.exists(pasta):
+                    try:
+                        os.replace(tmp, pasta)
+                    except OSError:
+                        # Sem 'fcntl', outro processo pode ter ganho a corrida.
+                        if not os.path.isdir(pasta):
+                            raise
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        self._invalidar_antigas(file_path, chave)
+        self._aplicar_limite(preservar=chave)
+
+    def obter(self, file_path, grafo, apenas_terminais=False, como_listas=True):
+        """
+        Devolve as matrizes de caminhos mínimos da instância, lendo-as do cache quando
+        possível ou calculando-as com 'grafo.all_pairs_dijkstra' e guardando-as.
+        Com 'como_listas=False', as matrizes devolvidas são as mapeadas em memória
+        (ver 'carregar').
+        """
+        hash_conteudo = hash_ficheiro(file_path)
+        resultado = self.carregar(file_path, apenas_terminais, como_listas, hash_conteudo)
+        if resultado is not None:
+            return resultado
+
+        dist, pred, node_to_index, index_to_node = grafo.all_pairs_dijkstra(apenas_terminais=apenas_terminais)
+        self.guardar(file_path, dist, pred, node_to_index, apenas_terminais, hash_conteudo)
+        if not como_listas:
+            return self.carregar(file_path, apenas_terminais, como_listas, hash_conteudo)
+        return dist, pred, node_to_index, index_to_node
+
+    # --- Política de Tamanho ---
+
+    def _entradas(self):
+        """ Lista as entradas do cache como tuplas (último acesso, tamanho, chave). """
+        entradas = []
+        for chave in os.listdir(self.diretorio):
+            pasta = self._pasta(chave)
+            if chave.startswith('.') or not os.path.isdir(pasta):
+                continue
+            # Outro processo pode remover a entrada entre a listagem e a consulta.
+            try:
+                tamanho = sum(e.stat().st_size for e in os.scandir(pasta) if e.is_file())
+                entradas.append((os.stat(pasta).st_mtime, tamanho, chave))
+            except FileNotFoundError:
+                continue
+        return entradas
+
+    def tamanho_total(self):
+        """ Retorna o espaço ocupado pelo cache, em bytes. """
+        return sum(tamanho for _, tamanho, _ in self._entradas())
+
+    def _aplicar_limite(self, preservar=None):
+        """ Remove as entradas menos usadas recentemente até respeitar o limite. """
+        entradas = sorted(self._entradas())
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        for _, tamanho, chave in entradas:
+            if total <= self.tamanho_maximo:
+                break
+            if chave == preservar:
+                continue
+            shutil.rmtree(self._pasta(chave), ignore_errors=True)
+            total -= tamanho
+
+    def limpar(self):
+        """ Remove todas as entradas do cache. """
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+        os.makedirs(self.diretorio, exist_ok=True)
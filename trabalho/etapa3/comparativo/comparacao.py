@@ -1,5 +1,29 @@
-import os
+# ARQUIVO: comparacao.py
+"""
+Comparação das soluções geradas ('sol-*.dat') com uma referência.
+
+A referência pode ser outra pasta de soluções no mesmo formato ou diretamente o
+ficheiro 'dados/reference_values.csv'. Só o cabeçalho (as 4 primeiras linhas) de
+cada solução é lido, os ficheiros são processados em paralelo e o resultado é
+escrito em CSV (linha a linha, à medida que as instâncias são lidas) ou em JSON,
+com agregados por família de instâncias.
+
+Exemplos:
+    python comparativo/comparacao.py solucoes --referencia dados/reference_values.csv --formato csv --saida comparativo.csv
+    python comparativo/comparacao.py solucoes --referencia comparativo/G0 --formato json
+"""
+
+# Imports necessários
+import argparse
+import csv
 import glob
+import json
+import math
+import multiprocessing
+import os
+import re
+import sys
+from itertools import islice
 
 def parse_solution_file(path):
     """
@@ -8,8 +32,9 @@ def parse_solution_file(path):
     """
     try:
         with open(path, 'r') as f:
-            # Lê apenas as linhas não vazias do ficheiro
-            lines = [l.strip() for l in f if l.strip()]
+            # Lê apenas as 4 primeiras linhas não vazias (o resto do ficheiro, com as
+            # rotas, não é necessário para a comparação)
+            lines = list(islice((l.strip() for l in f if l.strip()), 4))
             if len(lines) < 4:
                 return None  # Retorna None se o ficheiro não tiver o cabeçalho mínimo
 
@@ -130,12 +155,222 @@ def compare_solutions(dir_swap, dir_prof, output_path):
 
     print(f"\n✅ Relatório de comparação salvo em: {output_path}")
 
+# --- Comparação Estruturada (CSV/JSON) ---
+
+# Campos de cada linha do relatório estruturado, pela ordem das colunas do CSV.
+CAMPOS = [
+    'instancia', 'familia', 'estado',
+    'custo', 'custo_ref', 'gap',
+    'rotas', 'rotas_ref', 'diferenca_rotas',
+    'clocks_exec', 'clocks_exec_ref', 'razao_exec',
+    'clocks_melhor', 'clocks_melhor_ref', 'razao_melhor',
+]
+
+
+def familia_da_instancia(nome):
+    """ Família de uma instância (BHW, CBMix, DI-NEARP, mggdb, mgval...), pelo prefixo do nome. """
+    m = re.match(r'DI-NEARP|[A-Za-z]+', nome)
+    return m.group(0) if m else 'outras'
+
+
+def ler_referencias_csv(caminho):
+    """
+    Lê 'reference_values.csv' (Nome, Solucao, #Rotas, clocks, clocks_melhor_sol) para o
+    mesmo formato devolvido por 'parse_solution_file', indexado pelo nome da instância.
+    """
+    referencias = {}
+    with open(caminho, 'r', newline='') as f:
+        leitor = csv.reader(f, skipinitialspace=True)
+        next(leitor, None)  # cabeçalho
+        for campos in leitor:
+            if len(campos) < 5 or not campos[0].strip():
+                continue
+            referencias[campos[0].strip()] = {
+                'custo':       float(campos[1]),
+                'rotas':       int(campos[2]),
+                'clocks_exec': int(campos[3]),
+                'clocks_ref':  int(campos[4]),
+            }
+    return referencias
+
+
+def _razao(valor, referencia):
+    return valor / referencia if referencia > 0 else None
+
+
+def comparar_instancia(nome, solucao, referencia):
+    """
+    Compara o cabeçalho de uma solução com o da referência.
+
+    Returns:
+        dict: Uma linha com os campos de 'CAMPOS'. 'gap' é a diferença percentual de
+        custo e 'razao_*' são razões de tempo (solução / referência). 'estado' é 'ok',
+        'invalido' (solução mal-formada) ou 'sem_referencia'.
+    """
+    linha = dict.fromkeys(CAMPOS)
+    linha.update(instancia=nome, familia=familia_da_instancia(nome))
+    if solucao is None:
+        linha['estado'] = 'invalido'
+        return linha
+
+    linha.update(custo=solucao['custo'], rotas=solucao['rotas'],
+                 clocks_exec=solucao['clocks_exec'], clocks_melhor=solucao['clocks_ref'])
+    if referencia is None:
+        linha['estado'] = 'sem_referencia'
+        return linha
+
+    linha.update(
+        estado='ok',
+        custo_ref=referencia['custo'],
+        gap=(solucao['custo'] - referencia['custo']) / referencia['custo'] * 100 if referencia['custo'] > 0 else None,
+        rotas_ref=referencia['rotas'],
+        diferenca_rotas=solucao['rotas'] - referencia['rotas'],
+        clocks_exec_ref=referencia['clocks_exec'],
+        razao_exec=_razao(solucao['clocks_exec'], referencia['clocks_exec']),
+        clocks_melhor_ref=referencia['clocks_ref'],
+        razao_melhor=_razao(solucao['clocks_ref'], referencia['clocks_ref']),
+    )
+    return linha
+
+
+def _nome_instancia(caminho):
+    """ 'solucoes/sol-BHW1.dat' -> 'BHW1'. """
+    return os.path.splitext(os.path.basename(caminho))[0][len('sol-'):]
+
+
+def _comparar_ficheiro(tarefa):
+    """ Trabalho de cada processo: lê os cabeçalhos de um par (solução, referência). """
+    caminho, dir_referencia, referencia = tarefa
+    nome = _nome_instancia(caminho)
+    if dir_referencia is not None:
+        caminho_ref = os.path.join(dir_referencia, os.path.basename(caminho))
+        referencia = parse_solution_file(caminho_ref) if os.path.exists(caminho_ref) else None
+    return comparar_instancia(nome, parse_solution_file(caminho), referencia)
+
+
+def comparar_diretorio(dir_solucoes, referencia, processos=None):
+    """
+    Compara todas as soluções 'sol-*.dat' de 'dir_solucoes' com a referência, que pode
+    ser uma pasta de soluções ou o ficheiro 'reference_values.csv'.
+
+    Os ficheiros são lidos em paralelo, em blocos, e as linhas são produzidas por
+    ordem alfabética de instância à medida que ficam prontas (gerador), pelo que a
+    memória usada não depende do número de ficheiros.
+    """
+    caminhos = sorted(glob.glob(os.path.join(dir_solucoes, 'sol-*.dat')))
+    if os.path.isdir(referencia):
+        tarefas = [(c, referencia, None) for c in caminhos]
+    else:
+        referencias = ler_referencias_csv(referencia)
+        tarefas = [(c, None, referencias.get(_nome_instancia(c))) for c in caminhos]
+
+    processos = processos or os.cpu_count() or 1
+    if processos == 1 or len(tarefas) < 64:
+        yield from map(_comparar_ficheiro, tarefas)
+        return
+    with multiprocessing.Pool(processos) as pool:
+        yield from pool.imap(_comparar_ficheiro, tarefas, chunksize=max(1, len(tarefas) // (processos * 4)))
+
+
+class AgregadorFamilias:
+    """
+    Acumula, por família e no total, o número de instâncias, o gap médio e máximo, a
+    diferença média de rotas e a média geométrica das razões de tempo.
+    """
+    def __init__(self):
+        self.grupos = {}
+
+    def adicionar(self, linha):
+        for chave in (linha['familia'], 'TOTAL'):
+            g = self.grupos.setdefault(chave, {'instancias': 0, 'comparadas': 0, 'gaps': [], 'rotas': [],
+                                               'log_exec': [], 'log_melhor': []})
+            g['instancias'] += 1
+            if linha['estado'] != 'ok':
+                continue
+            g['comparadas'] += 1
+            if linha['gap'] is not None:
+                g['gaps'].append(linha['gap'])
+            g['rotas'].append(linha['diferenca_rotas'])
+            for campo, destino in (('razao_exec', 'log_exec'), ('razao_melhor', 'log_melhor')):
+                if linha[campo]:
+                    g[destino].append(math.log(linha[campo]))
+
+    def resultado(self):
+        def media(valores):
+            return sum(valores) / len(valores) if valores else None
+
+        resultado = {}
+        for chave in sorted(self.grupos, key=lambda c: (c == 'TOTAL', c)):
+            g = self.grupos[chave]
+            log_exec, log_melhor = media(g['log_exec']), media(g['log_melhor'])
+            resultado[chave] = {
+                'instancias': g['instancias'],
+                'comparadas': g['comparadas'],
+                'gap_medio': media(g['gaps']),
+                'gap_maximo': max(g['gaps']) if g['gaps'] else None,
+                'diferenca_rotas_media': media(g['rotas']),
+                'razao_exec_geometrica': math.exp(log_exec) if log_exec is not None else None,
+                'razao_melhor_geometrica': math.exp(log_melhor) if log_melhor is not None else None,
+            }
+        return resultado
+
+
+def escrever_csv(linhas, saida, agregador):
+    """ Escreve as linhas em CSV à medida que são produzidas. """
+    escritor = csv.DictWriter(saida, fieldnames=CAMPOS)
+    escritor.writeheader()
+    for linha in linhas:
+        agregador.adicionar(linha)
+        escritor.writerow(linha)
+
+
+def escrever_json(linhas, saida, agregador):
+    """ Escreve um objeto JSON com as linhas por instância e os agregados por família. """
+    instancias = []
+    for linha in linhas:
+        agregador.adicionar(linha)
+        instancias.append(linha)
+    json.dump({'instancias': instancias, 'familias': agregador.resultado()}, saida, indent=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compara as soluções geradas com uma referência.')
+    parser.add_argument('solucoes', help="Pasta com as soluções 'sol-*.dat'.")
+    parser.add_argument('--referencia', default='dados/reference_values.csv',
+                        help="Ficheiro 'reference_values.csv' ou pasta com as soluções de referência.")
+    parser.add_argument('--formato', choices=('csv', 'json'), default='csv')
+    parser.add_argument('--saida', default=None, help='Ficheiro de saída (padrão: saída padrão).')
+    parser.add_argument('--agregados', default=None, metavar='JSON',
+                        help='No formato CSV, escreve também os agregados por família neste ficheiro.')
+    parser.add_argument('--processos', type=int, default=None, help='Número de processos (padrão: número de núcleos).')
+    args = parser.parse_args(argv)
+
+    agregador = AgregadorFamilias()
+    linhas = comparar_diretorio(args.solucoes, args.referencia, args.processos)
+    saida = open(args.saida, 'w', newline='', encoding='utf-8') if args.saida else sys.stdout
+    try:
+        if args.formato == 'csv':
+            escrever_csv(linhas, saida, agregador)
+        else:
+            escrever_json(linhas, saida, agregador)
+    finally:
+        if args.saida:
+            saida.close()
+
+    familias = agregador.resultado()
+    if args.agregados:
+        with open(args.agregados, 'w', encoding='utf-8') as f:
+            json.dump(familias, f, indent=1)
+
+    # Resumo por família (no stderr, para não se misturar com o CSV/JSON na saída padrão).
+    for chave, g in familias.items():
+        gap = f"{g['gap_medio']:+.2f}%" if g['gap_medio'] is not None else '-'
+        razao = f"{g['razao_exec_geometrica']:.4f}" if g['razao_exec_geometrica'] is not None else '-'
+        print(f"{chave:<10} {g['comparadas']:>4}/{g['instancias']:<4} gap médio {gap:>9}  razão de tempo {razao}",
+              file=sys.stderr)
+    return 0
+
+
 # Ponto de entrada do script
 if __name__ == "__main__":
-    # Definição dos caminhos para os diretórios de soluções
-    dir_swap = r"E:\Etapa_03\solucoes"
-    dir_prof = r"E:\Etapa_03\comparativo\G0"
-    output_path = r"E:\Etapa_03\comparativo\comparativo_relatorio.txt"
-
-    # Chama a função principal para iniciar o processo de comparação
-    compare_solutions(dir_swap, dir_prof, output_path)
+    sys.exit(main())
@@ -0,0 +1,317 @@
+# ARQUIVO: executar_lote.py
+"""
+Executor em lote das instâncias, pela linha de comando.
+
+Substitui o laço serial do notebook 'etapa_03.ipynb': distribui as instâncias por
+vários processos, aplica um limite de tempo a cada instância, retoma execuções
+interrompidas (ignorando as soluções 'sol-*.dat' já escritas) e processa primeiro as
+instâncias maiores, para que a execução não termine à espera de uma única instância
+longa.
+
+Exemplo:
+    python executar_lote.py --entrada dados/MCGRP --saida solucoes --processos 8 --timeout 600
+"""
+
+# Imports necessários
+import argparse
+import glob
+import os
+import sys
+import time
+import traceback
+import multiprocessing
+from multiprocessing.connection import wait
+
+from instancia import parse_instance
+from grafo import CustomGraph
+from solucao import (TabelaServicos, preparar_servicos, construtivo_guloso_vizinho_mais_proximo, construtivo_split,
+                     carregar_solucao)
+from otimizacao import swap_entre_rotas, calcular_vizinhos_granulares, vnd
+from metaheuristica import busca_local_iterada, multi_inicio
+from cache_caminhos import CacheCaminhos
+import telemetria
+
+
+def resolver_instancia(filepath, cache=None, apenas_terminais=False, granular=None, busca='swap', politica='melhor',
+                       construtivo='guloso', tempo_limite=None, max_iteracoes=None, semente=None,
+                       inicios=None, processos_inicios=None, solucao_inicial=None):
+    """
+    Executa o pipeline completo (leitura, grafo, caminhos mínimos, construtivo e busca
+    local) para uma instância.
+
+    Args:
+        filepath (str): Caminho para o ficheiro .dat da instância.
+        cache (CacheCaminhos | None): Cache opcional das matrizes de caminhos mínimos.
+        apenas_terminais (bool): Usa a matriz compacta restrita aos nós terminais.
+        granular (int | None): Se indicado, a busca local avalia primeiro só as trocas
+            que põem um serviço perto de um dos 'granular' melhores vizinhos de rota.
+        busca (str): 'swap' (troca entre rotas) ou 'vnd' (descida em vizinhança variável).
+        politica (str): Política de aceitação do VND, 'melhor' ou 'primeira'.
+        construtivo (str): 'guloso' (vizinho mais próximo) ou 'split' (tour gigante + Split).
+        tempo_limite (float | None): Se indicado (ou 'max_iteracoes'), a busca local é
+            repetida pela busca local iterada até esgotar este tempo, em segundos desde o
+            início da instância.
+        max_iteracoes (int | None): Orçamento de iterações da busca local iterada.
+        semente (int | None): Semente da busca local iterada.
+        inicios (int | None): Se indicado, resolve a instância com 'inicios' trajetórias
+            independentes (construtivo Split aleatório + busca local iterada ou VND) em
+            'processos_inicios' processos, ignorando 'construtivo', 'busca' e 'granular'.
+        processos_inicios (int | None): Processos do multi-início (padrão: número de núcleos).
+        solucao_inicial (str | None): Caminho de um 'sol-*.dat' anterior desta instância.
+            Se existir, a otimização continua a partir dele (warm start) em vez do
+            construtivo (no multi-início, é o ponto de partida do início 0). Um ficheiro
+            inválido é ignorado com um aviso.
+
+    Returns:
+        tuple: (solucao, clocks_total, clocks_melhor_sol), com os tempos em microssegundos;
+        'clocks_melhor_sol' é o instante, desde o início, em que a melhor solução apareceu.
+    """
+    tempo_inicio_total = time.perf_counter()
+
+    with telemetria.fase('leitura'):
+        parsed_data = parse_instance(filepath)
+    with telemetria.fase('grafo'):
+        g = CustomGraph(parsed_data)
+        # Falha em milissegundos, antes dos caminhos mínimos, se houver serviços inalcançáveis.
+        g.verificar_alcancabilidade()
+    with telemetria.fase('caminhos'):
+        if cache is not None:
+            dist, pred, node_to_index, index_to_node = cache.obter(filepath, g, apenas_terminais=apenas_terminais)
+        else:
+            dist, pred, node_to_index, index_to_node = g.all_pairs_dijkstra(apenas_terminais=apenas_terminais)
+    servicos_info = TabelaServicos(preparar_servicos(parsed_data), node_to_index)
+
+    solucao_carregada = None
+    if solucao_inicial is not None and os.path.exists(solucao_inicial):
+        with telemetria.fase('solucao_inicial'):
+            try:
+                solucao_carregada = carregar_solucao(solucao_inicial, servicos_info, dist, node_to_index,
+                                                     g.depot, g.capacity)
+            except ValueError as e:
+                print(f'Aviso: solução inicial ignorada ({e})', file=sys.stderr)
+
+    if inicios:
+        with telemetria.fase('multi_inicio'):
+            solucao_melhorada, _ = multi_inicio(
+                g, servicos_info, dist, node_to_index, num_inicios=inicios, processos=processos_inicios,
+                semente=semente or 0, tempo_limite=tempo_limite, max_iteracoes=max_iteracoes, inicio=tempo_inicio_total,
+                solucao_inicial=solucao_carregada
+            )
+        clocks_total = (time.perf_counter() - tempo_inicio_total) * 1_000_000
+        return solucao_melhorada, clocks_total, solucao_melhorada.tempo_melhor_sol
+
+    with telemetria.fase('construtivo'):
+        if solucao_carregada is not None:
+            solucao_construtiva = solucao_carregada
+        elif construtivo == 'split':
+            solucao_construtiva = construtivo_split(g, servicos_info, dist, node_to_index)
+        else:
+            solucao_construtiva = construtivo_guloso_vizinho_mais_proximo(g, servicos_info, dist, node_to_index)
+
+    if busca == 'vnd':
+        def busca_local(solucao):
+            return vnd(solucao, g, servicos_info, dist, node_to_index, politica=politica)
+    else:
+        vizinhos = calcular_vizinhos_granulares(g, servicos_info, dist, node_to_index, granular) if granular else None
+        def busca_local(solucao):
+            return swap_entre_rotas(solucao, g, servicos_info, dist, node_to_index, vizinhos)
+
+    if tempo_limite is not None or max_iteracoes is not None:
+        with telemetria.fase('busca_local_iterada'):
+            solucao_melhorada = busca_local_iterada(
+                solucao_construtiva, g, servicos_info, dist, node_to_index,
+                tempo_limite=tempo_limite, max_iteracoes=max_iteracoes, busca_local=busca_local,
+                semente=semente, inicio=tempo_inicio_total
+            )
+    else:
+        with telemetria.fase('busca_local'):
+            solucao_melhorada = busca_local(solucao_construtiva)
+        # Numa única passagem, a melhor solução é a que sai da busca local.
+        solucao_melhorada.tempo_melhor_sol = (time.perf_counter() - tempo_inicio_total) * 1_000_000
+    tempo_fim = time.perf_counter()
+
+    clocks_total = (tempo_fim - tempo_inicio_total) * 1_000_000
+    return solucao_melhorada, clocks_total, solucao_melhorada.tempo_melhor_sol
+
+
+def _processar_instancia(filepath, out_path, diretorio_cache, opcoes, diretorio_telemetria=None):
+    """
+    Ponto de entrada de cada processo trabalhador. A solução é escrita num ficheiro
+    temporário e só é movida para 'out_path' no fim, para que uma instância
+    interrompida (por erro ou por timeout) nunca deixe um 'sol-*.dat' incompleto.
+    'opcoes' são os argumentos nomeados de 'resolver_instancia'. Com
+    'diretorio_telemetria', o traço da instância é escrito em '<instância>.json'.
+    """
+    inst_name = os.path.splitext(os.path.basename(filepath))[0]
+    tmp_path = out_path + '.tmp'
+    if diretorio_telemetria:
+        telemetria.ativar()
+    estado = 'erro'
+    try:
+        cache = CacheCaminhos(diretorio_cache) if diretorio_cache else None
+        solucao, clocks_total, clocks_melhor_sol = resolver_instancia(filepath, cache, **opcoes)
+        with open(tmp_path, 'w') as fout:
+            solucao.escrever(fout, tempo_total=clocks_total, tempo_melhor_sol=clocks_melhor_sol)
+        os.replace(tmp_path, out_path)
+        estado = 'ok'
+    except Exception:
+        traceback.print_exc()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        sys.exit(1)
+    finally:
+        if diretorio_telemetria:
+            telemetria.guardar(os.path.join(diretorio_telemetria, f'{inst_name}.json'),
+                               instancia=inst_name, estado=estado, opcoes=opcoes)
+
+
+def listar_pendentes(input_dir, output_dir, refazer=False):
+    """
+    Lista as instâncias a processar, da maior para a menor (pelo tamanho do ficheiro).
+    Sem 'refazer', as instâncias que já têm solução em 'output_dir' são ignoradas.
+    """
+    pendentes = []
+    for filepath in glob.glob(os.path.join(input_dir, '*.dat')):
+        inst_name = os.path.splitext(os.path.basename(filepath))[0]
+        out_path = os.path.join(output_dir, f'sol-{inst_name}.dat')
+        if not refazer and os.path.exists(out_path):
+            continue
+        pendentes.append((filepath, out_path))
+    pendentes.sort(key=lambda item: (-os.path.getsize(item[0]), item[0]))
+    return pendentes
+
+
+def executar_lote(input_dir, output_dir, processos=None, timeout=None, refazer=False, diretorio_cache=None,
+                  diretorio_telemetria=None, diretorio_inicial=None, **opcoes):
+    """
+    Processa todas as instâncias pendentes em paralelo. Os argumentos nomeados
+    adicionais ('opcoes') são repassados a 'resolver_instancia'. Com
+    'diretorio_telemetria', cada instância escreve nessa pasta um traço JSON com os
+    tempos por fase e os contadores da busca (ver 'telemetria.py'); para as instâncias
+    terminadas por timeout, o traço só tem os metadados, com estado 'timeout'.
+
+    Com 'diretorio_inicial', cada instância continua a partir do seu 'sol-*.dat' nessa
+    pasta, quando existe (warm start). Se for a própria 'output_dir', as instâncias já
+    resolvidas deixam de ser ignoradas e a solução é substituída pela continuação, que
+    nunca é pior (a busca local e a busca local iterada partem dela).
+
+    Cada instância corre no seu próprio processo, o que permite terminá-lo quando o
+    limite de tempo ('timeout', em segundos) é excedido. No máximo 'processos'
+    instâncias correm ao mesmo tempo.
+
+    Returns:
+        dict: Contagem de instâncias por estado ('ok', 'erro', 'timeout', 'ignoradas').
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if diretorio_telemetria:
+        os.makedirs(diretorio_telemetria, exist_ok=True)
+    processos = processos or os.cpu_count() or 1
+    if diretorio_inicial and os.path.abspath(diretorio_inicial) == os.path.abspath(output_dir):
+        refazer = True
+    pendentes = listar_pendentes(input_dir, output_dir, refazer)
+    total = len(glob.glob(os.path.join(input_dir, '*.dat')))
+    resumo = {'ok': 0, 'erro': 0, 'timeout': 0, 'ignoradas': total - len(pendentes)}
+
+    print(f'{len(pendentes)} instâncias a processar ({resumo["ignoradas"]} já resolvidas), {processos} processos.')
+
+    fila = list(reversed(pendentes))  # 'pop()' retira sempre a maior instância restante
+    em_execucao = {}  # sentinel -> (processo, nome, prazo, opcoes)
+
+    while fila or em_execucao:
+        # Lança novos processos até ocupar todos os lugares disponíveis.
+        while fila and len(em_execucao) < processos:
+            filepath, out_path = fila.pop()
+            inst_name = os.path.splitext(os.path.basename(filepath))[0]
+            opcoes_instancia = opcoes
+            if diretorio_inicial:
+                opcoes_instancia = dict(opcoes, solucao_inicial=os.path.join(diretorio_inicial, f'sol-{inst_name}.dat'))
+            p = multiprocessing.Process(
+                target=_processar_instancia,
+                args=(filepath, out_path, diretorio_cache, opcoes_instancia, diretorio_telemetria),
+                name=inst_name
+            )
+            p.start()
+            prazo = time.monotonic() + timeout if timeout else None
+            em_execucao[p.sentinel] = (p, inst_name, prazo, opcoes_instancia)
+            print(f'▶ Processando {inst_name}...')
+
+        # Espera até um processo terminar ou até ao prazo mais próximo.
+        prazos = [prazo for _, _, prazo, _ in em_execucao.values() if prazo is not None]
+        espera = max(0, min(prazos) - time.monotonic()) if prazos else None
+        terminados = wait(list(em_execucao), timeout=espera)
+
+        for sentinel in terminados:
+            p, inst_name, _, _ = em_execucao.pop(sentinel)
+            p.join()
+            if p.exitcode == 0:
+                resumo['ok'] += 1
+                print(f'✅ OK: {inst_name}')
+            else:
+                resumo['erro'] += 1
+                print(f'❌ ERRO AO PROCESSAR {inst_name} (código {p.exitcode})')
+
+        agora = time.monotonic()
+        for sentinel, (p, inst_name, prazo, opcoes_instancia) in list(em_execucao.items()):
+            if prazo is not None and agora >= prazo:
+                p.terminate()
+                p.join()
+                em_execucao.pop(sentinel)
+                tmp_path = os.path.join(output_dir, f'sol-{inst_name}.dat.tmp')
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                if diretorio_telemetria:
+                    # O processo terminado não chegou a escrever o seu traço.
+                    telemetria.guardar(os.path.join(diretorio_telemetria, f'{inst_name}.json'),
+                                       telemetria.traco_vazio(instancia=inst_name, estado='timeout',
+                                                              opcoes=opcoes_instancia, timeout=timeout))
+                resumo['timeout'] += 1
+                print(f'⏱ TIMEOUT: {inst_name} excedeu {timeout}s')
+
+    print(f"\nConcluído: {resumo['ok']} ok, {resumo['erro']} erros, {resumo['timeout']} timeouts, "
+          f"{resumo['ignoradas']} ignoradas.")
+    return resumo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Resolve em paralelo todas as instâncias de uma pasta.')
+    parser.add_argument('--entrada', default='dados/MCGRP', help='Pasta com as instâncias (.dat).')
+    parser.add_argument('--saida', default='solucoes', help='Pasta onde as soluções são escritas.')
+    parser.add_argument('--processos', type=int, default=None, help='Número de processos (padrão: número de núcleos).')
+    parser.add_argument('--timeout', type=float, default=None, help='Limite de tempo por instância, em segundos.')
+    parser.add_argument('--refazer', action='store_true', help='Volta a resolver instâncias que já têm solução.')
+    parser.add_argument('--cache', default=None, help='Pasta do cache de caminhos mínimos (desativado por padrão).')
+    parser.add_argument('--telemetria', default=None, metavar='PASTA',
+                        help='Escreve nesta pasta um traço JSON por instância (tempos por fase e contadores).')
+    parser.add_argument('--continuar', nargs='?', const='', default=None, metavar='PASTA',
+                        help="Warm start: continua a partir das soluções 'sol-*.dat' de PASTA (por omissão, a pasta de saída).")
+    parser.add_argument('--terminais', action='store_true', help='Calcula a matriz apenas entre os nós terminais.')
+    parser.add_argument('--granular', type=int, default=None, metavar='K',
+                        help='Busca local granular: troca primeiro com os K melhores vizinhos de rota.')
+    parser.add_argument('--construtivo', choices=('guloso', 'split'), default='guloso',
+                        help='Solução inicial: vizinho mais próximo (padrão) ou tour gigante dividido pelo Split.')
+    parser.add_argument('--busca', choices=('swap', 'vnd'), default='swap',
+                        help='Busca local: troca entre rotas (padrão) ou VND com várias vizinhanças.')
+    parser.add_argument('--tempo-limite', type=float, default=None, metavar='SEG',
+                        help='Busca local iterada até SEG segundos por instância (desativada por padrão).')
+    parser.add_argument('--iteracoes', type=int, default=None, metavar='N',
+                        help='Busca local iterada com no máximo N iterações por instância.')
+    parser.add_argument('--semente', type=int, default=None, help='Semente da busca local iterada.')
+    parser.add_argument('--inicios', type=int, default=None, metavar='N',
+                        help='Multi-início: N trajetórias independentes por instância, com sementes reprodutíveis.')
+    parser.add_argument('--processos-inicios', type=int, default=None, metavar='P',
+                        help='Processos usados pelo multi-início de cada instância (padrão: número de núcleos).')
+    parser.add_argument('--politica', choices=('melhor', 'primeira'), default='melhor',
+                        help='Política do VND: best improvement (padrão) ou first improvement.')
+    args = parser.parse_args(argv)
+
+    diretorio_inicial = (args.continuar or args.saida) if args.continuar is not None else None
+    resumo = executar_lote(args.entrada, args.saida, args.processos, args.timeout, args.refazer, args.cache, args.telemetria,
+                           diretorio_inicial, apenas_terminais=args.terminais, granular=args.granular, busca=args.busca,
+                           politica=args.politica, construtivo=args.construtivo, tempo_limite=args.tempo_limite,
+                           max_iteracoes=args.iteracoes, semente=args.semente, inicios=args.inicios,
+                           processos_inicios=args.processos_inicios)
+    return 0 if resumo['erro'] == 0 and resumo['timeout'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,9 +2,581 @@
 
 # Imports necessários
 import heapq
-from collections import defaultdict
+from collections import defaultdict, deque
 import math
+import random
 import matplotlib.pyplot as plt
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+
+import telemetria
+
+# --- Núcleo Compacto do Grafo (CSR) ---
+
+def _dijkstra_csr(offsets, alvos, pesos, n, origem):
+    """
+    Dijkstra com fila de prioridade (heapq) sobre as listas de um GrafoCSR.
+    Retorna as distâncias, os predecessores (-1 se inexistente) e a ordem de fecho.
+    """
+    INF = float('inf')
+    dist = [INF] * n
+    pred = [-1] * n
+    ordem = []
+    dist[origem] = 0
+    pq = [(0, origem)]
+    descartados = 0
+
+    while pq:
+        d, u = heapq.heappop(pq)
+        if d > dist[u]:
+            descartados += 1
+            continue
+        ordem.append(u)
+
+        for k in range(offsets[u], offsets[u + 1]):
+            v = alvos[k]
+            nova = d + pesos[k]
+            if nova < dist[v]:
+                dist[v] = nova
+                pred[v] = u
+                heapq.heappush(pq, (nova, v))
+
+    if telemetria.ATIVA:
+        # A fila é esvaziada, pelo que inserções = remoções = fechados + entradas obsoletas.
+        telemetria.contar('dijkstra.execucoes')
+        telemetria.contar('dijkstra.heap_operacoes', len(ordem) + descartados)
+        telemetria.contar('dijkstra.entradas_obsoletas', descartados)
+    return dist, pred, ordem
+
+
+def _linha_caminhos(listas, n, origem, linha_idx, colunas, compacto):
+    """
+    Calcula as linhas de 'dist_matrix' e 'pred_matrix' para um vértice de origem.
+
+    Com 'colunas=None' as linhas cobrem todos os vértices do CSR. Caso contrário,
+    cobrem apenas os vértices em 'colunas' (os terminais) e 'compacto' dá o índice
+    compacto de cada vértice (-1 se não for terminal); o predecessor passa a ser o
+    último terminal do caminho.
+    """
+    offsets, alvos, pesos = listas
+    dist, pred, ordem = _dijkstra_csr(offsets, alvos, pesos, n, origem)
+    if colunas is None:
+        pred[origem] = linha_idx
+        return dist, pred
+
+    # Propaga, pela ordem de fecho do Dijkstra, o último terminal visto no caminho.
+    # O predecessor de cada nó é sempre fechado antes dele, o que torna isto O(V).
+    ultimo_terminal = [-1] * n
+    ultimo_terminal[origem] = linha_idx
+    for x in ordem[1:]:
+        p = pred[x]
+        ultimo_terminal[x] = compacto[p] if compacto[p] != -1 else ultimo_terminal[p]
+    return [dist[t] for t in colunas], [ultimo_terminal[t] for t in colunas]
+
+
+def distancias_inteiras(dist):
+    """ Indica se todas as distâncias finitas de uma matriz NumPy são números inteiros. """
+    finitas = dist[np.isfinite(dist)]
+    return bool(np.array_equal(finitas, np.trunc(finitas)))
+
+
+def distancias_em_listas(dist):
+    """
+    Converte uma matriz de distâncias NumPy (float64) em listas de listas com os mesmos
+    tipos que o Dijkstra sequencial produz: com custos inteiros, as distâncias finitas
+    voltam a ser 'int' e as infinitas ficam 'float('inf')'.
+    """
+    dist = np.asarray(dist)
+    if not distancias_inteiras(dist):
+        return dist.tolist()
+    finitas = np.isfinite(dist)
+    linhas = np.where(finitas, dist, 0).astype(np.int64).tolist()
+    for i, j in zip(*np.nonzero(~finitas)):
+        linhas[i][j] = float('inf')
+    return linhas
+
+
+# Estado de cada processo trabalhador do 'all_pairs_dijkstra' paralelo.
+_TRABALHADOR = {}
+
+def _iniciar_trabalhador(listas, n, colunas, compacto, nome_dist, nome_pred, forma):
+    """ Liga o processo trabalhador aos buffers de memória partilhada do resultado. """
+    shm_dist = shared_memory.SharedMemory(name=nome_dist)
+    shm_pred = shared_memory.SharedMemory(name=nome_pred)
+    _TRABALHADOR.update(
+        listas=listas, n=n, colunas=colunas, compacto=compacto,
+        shm=(shm_dist, shm_pred),
+        dist=np.ndarray(forma, dtype=np.float64, buffer=shm_dist.buf),
+        pred=np.ndarray(forma, dtype=np.int32, buffer=shm_pred.buf),
+    )
+
+def _calcular_linhas(tarefas):
+    """ Calcula as linhas de um bloco de origens e escreve-as diretamente na memória partilhada. """
+    t = _TRABALHADOR
+    for linha_idx, origem in tarefas:
+        dist, pred = _linha_caminhos(t['listas'], t['n'], origem, linha_idx, t['colunas'], t['compacto'])
+        t['dist'][linha_idx] = dist
+        t['pred'][linha_idx] = pred
+    return len(tarefas)
+
+
+class GrafoCSR:
+    """
+    Representação imutável do grafo no formato CSR (compressed sparse row).
+
+    Os vértices recebem IDs densos 0..n-1 (pela ordem crescente do ID original) e as
+    ligações de saída de cada vértice 'i' ocupam o intervalo
+    'alvos[offsets[i]:offsets[i+1]]' (com os custos correspondentes em 'pesos').
+    Arestas contribuem com as duas direções e arcos apenas com a sua. É construída uma
+    única vez a partir da saída de 'parse_instance' (ou das colunas de
+    'parse_instance_rapido') e evita o custo de objetos Python (dicionários, tuplas)
+    nos algoritmos de caminhos mínimos, graus e componentes.
+    """
+    def __init__(self, parsed_data):
+        if "colunas" in parsed_data:
+            origens, destinos, custos, vertices = self._ligacoes_colunares(parsed_data)
+        else:
+            origens, destinos, custos, vertices = self._ligacoes_dicionarios(parsed_data)
+
+        self._montar(origens, destinos, custos, vertices)
+
+    @classmethod
+    def de_ligacoes(cls, vertices, arestas, arcos):
+        """
+        Constrói o CSR a partir de um conjunto de vértices e de listas de tuplas
+        (u, v, custo) de arestas e de arcos, pela mesma ordem que '__init__' usaria.
+        Usado pelo 'CustomGraph' para reconstruir o núcleo depois de alterar ligações.
+        """
+        origens, destinos, custos = [], [], []
+        for u, v, cost in arestas:
+            origens += (u, v)
+            destinos += (v, u)
+            custos += (cost, cost)
+        for u, v, cost in arcos:
+            origens.append(u)
+            destinos.append(v)
+            custos.append(cost)
+        csr = cls.__new__(cls)
+        csr._montar(np.array(origens, dtype=np.int64), np.array(destinos, dtype=np.int64),
+                    np.array(custos, dtype=np.int64), np.array(sorted(vertices), dtype=np.int64))
+        return csr
+
+    def _montar(self, origens, destinos, custos, vertices):
+        """ Preenche as estruturas CSR a partir das ligações (IDs de nó originais). """
+        self.n = len(vertices)
+        self.index_to_node = vertices
+        self.node_to_index = {node: i for i, node in enumerate(vertices.tolist())}
+
+        origem_idx = np.searchsorted(vertices, origens)
+        destino_idx = np.searchsorted(vertices, destinos)
+        ordem = np.argsort(origem_idx, kind='stable')
+
+        self.offsets = np.zeros(self.n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(origem_idx, minlength=self.n), out=self.offsets[1:])
+        self.alvos = destino_idx[ordem]
+        self.pesos = custos[ordem]
+
+        for array in (self.index_to_node, self.offsets, self.alvos, self.pesos):
+            array.flags.writeable = False
+        self._listas = None
+        self._listas_invertidas = None
+
+    @staticmethod
+    def _ligacoes_dicionarios(parsed_data):
+        """ Extrai as ligações do formato em listas de dicionários de 'parse_instance'. """
+        origens, destinos, custos = [], [], []
+        vertices = {parsed_data["meta"]["depot"]}
+        vertices.update(node_data['id'] for node_data in parsed_data.get("ReN", []))
+
+        # A ordem de inserção é a mesma da lista de adjacência do CustomGraph, para que
+        # os desempates do Dijkstra (e, portanto, os predecessores) sejam idênticos.
+        for secao, direcionado in (("ReE", False), ("NrE", False), ("ReA", True), ("NrA", True)):
+            for dados in parsed_data.get(secao, []):
+                u, v, cost = dados['u'], dados['v'], dados['cost']
+                origens.append(u)
+                destinos.append(v)
+                custos.append(cost)
+                if not direcionado:
+                    origens.append(v)
+                    destinos.append(u)
+                    custos.append(cost)
+                vertices.add(u)
+                vertices.add(v)
+
+        return (np.array(origens, dtype=np.int64), np.array(destinos, dtype=np.int64),
+                np.array(custos, dtype=np.int64), np.array(sorted(vertices), dtype=np.int64))
+
+    @staticmethod
+    def _ligacoes_colunares(parsed_data):
+        """
+        Extrai as ligações das colunas de 'parse_instance_rapido', sem laços em Python.
+        Cada aresta gera as ligações u->v e v->u intercaladas, na mesma ordem do caso
+        com dicionários.
+        """
+        colunas = parsed_data["colunas"]
+        origens, destinos, custos = [], [], []
+        for secao, direcionado in (("ReE", False), ("NrE", False), ("ReA", True), ("NrA", True)):
+            u, v, cost = colunas[secao]['u'], colunas[secao]['v'], colunas[secao]['cost']
+            if direcionado:
+                origens.append(u)
+                destinos.append(v)
+                custos.append(cost)
+            else:
+                origens.append(np.column_stack((u, v)).ravel())
+                destinos.append(np.column_stack((v, u)).ravel())
+                custos.append(np.repeat(cost, 2))
+
+        origens = np.concatenate(origens).astype(np.int64)
+        destinos = np.concatenate(destinos).astype(np.int64)
+        vertices = np.unique(np.concatenate((
+            [parsed_data["meta"]["depot"]], colunas["ReN"]['id'], origens, destinos
+        )).astype(np.int64))
+        return origens, destinos, np.concatenate(custos).astype(np.int64), vertices
+
+    def num_ligacoes(self):
+        """Retorna o número de ligações direcionadas armazenadas (arestas contam duas vezes)."""
+        return len(self.alvos)
+
+    def graus(self):
+        """Retorna o grau de saída de cada vértice, indexado pelo ID denso."""
+        return np.diff(self.offsets)
+
+    def listas(self):
+        """
+        Retorna cópias em listas Python de 'offsets', 'alvos' e 'pesos'. Os laços em
+        Python puro são mais rápidos sobre listas do que sobre arrays NumPy, e como a
+        estrutura é imutável as listas são calculadas apenas uma vez.
+        """
+        if self._listas is None:
+            self._listas = (self.offsets.tolist(), self.alvos.tolist(), self.pesos.tolist())
+        return self._listas
+
+    def listas_invertidas(self):
+        """
+        Retorna 'offsets', 'origens' e 'pesos' do grafo transposto (as ligações de
+        entrada de cada vértice), também em listas Python e calculadas apenas uma vez.
+        Um Dijkstra sobre estas listas dá as distâncias de todos os vértices até à origem.
+        """
+        if self._listas_invertidas is None:
+            origens = np.repeat(np.arange(self.n, dtype=np.int64), np.diff(self.offsets))
+            ordem = np.argsort(self.alvos, kind='stable')
+            offsets = np.zeros(self.n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.alvos, minlength=self.n), out=offsets[1:])
+            self._listas_invertidas = (offsets.tolist(), origens[ordem].tolist(), self.pesos[ordem].tolist())
+        return self._listas_invertidas
+
+    def custo_ligacao(self, origem, destino):
+        """ Menor custo entre as ligações diretas origem -> destino (IDs densos), ou infinito. """
+        inicio, fim = self.offsets[origem], self.offsets[origem + 1]
+        custos = self.pesos[inicio:fim][self.alvos[inicio:fim] == destino]
+        return int(custos.min()) if len(custos) else float('inf')
+
+    def dijkstra(self, origem):
+        """
+        Executa o Dijkstra a partir do vértice de ID denso 'origem'. Retorna as listas de
+        distâncias e de predecessores (IDs densos, -1 se inexistente) e a ordem em que
+        os vértices foram fechados.
+        """
+        offsets, alvos, pesos = self.listas()
+        return _dijkstra_csr(offsets, alvos, pesos, self.n, origem)
+
+    def betweenness_brandes(self, amostras=None, semente=None):
+        """
+        Centralidade de intermediação pelo algoritmo de Brandes (versão ponderada).
+
+        Para cada origem, um Dijkstra conta o número de caminhos mínimos até cada vértice
+        ('sigma') e guarda todos os predecessores em caminhos mínimos; as dependências
+        são depois acumuladas na ordem inversa de fecho. O custo total é O(n·m log n) e
+        todos os caminhos mínimos de cada par são considerados, não apenas um.
+
+        Args:
+            amostras (int | None): Se indicado, usa apenas 'amostras' origens escolhidas
+                ao acaso e reescala o resultado por n / amostras (centralidade aproximada).
+            semente (int | None): Semente do gerador aleatório da amostragem.
+
+        Returns:
+            list[float]: A centralidade de cada vértice, indexada pelo ID denso.
+
+        Raises:
+            ValueError: Se 'amostras' for menor do que 1.
+        """
+        if amostras is not None and amostras < 1:
+            raise ValueError(f"O número de amostras tem de ser pelo menos 1 (recebido: {amostras}).")
+        offsets, alvos, pesos = self.listas()
+        n = self.n
+        INF = float('inf')
+        if amostras is not None and amostras < n:
+            origens = random.Random(semente).sample(range(n), amostras)
+        else:
+            origens = range(n)
+
+        centralidade = [0.0] * n
+        for s in origens:
+            dist = [INF] * n
+            sigma = [0] * n
+            predecessores = [[] for _ in range(n)]
+            fechado = [False] * n
+            pilha = []
+            dist[s] = 0
+            sigma[s] = 1
+            pq = [(0, s)]
+
+            while pq:
+                d, u = heapq.heappop(pq)
+                if fechado[u]:
+                    continue
+                fechado[u] = True
+                pilha.append(u)
+
+                for k in range(offsets[u], offsets[u + 1]):
+                    v = alvos[k]
+                    nova = d + pesos[k]
+                    if nova < dist[v]:
+                        dist[v] = nova
+                        sigma[v] = sigma[u]
+                        predecessores[v] = [u]
+                        heapq.heappush(pq, (nova, v))
+                    elif nova == dist[v] and not fechado[v]:
+                        sigma[v] += sigma[u]
+                        predecessores[v].append(u)
+
+            # Acumulação das dependências, do vértice mais distante para a origem.
+            delta = [0.0] * n
+            for w in reversed(pilha):
+                coeficiente = (1.0 + delta[w]) / sigma[w]
+                for v in predecessores[w]:
+                    delta[v] += sigma[v] * coeficiente
+                if w != s:
+                    centralidade[w] += delta[w]
+
+        if len(origens) < n:
+            escala = n / len(origens)
+            centralidade = [c * escala for c in centralidade]
+        return centralidade
+
+    def alcancaveis(self, origem, invertido=False):
+        """
+        Retorna uma lista booleana com os vértices alcançáveis a partir de 'origem' (ID
+        denso) por uma busca em largura em O(n + m). Com 'invertido=True', percorre o
+        grafo transposto, isto é, marca os vértices a partir dos quais 'origem' é
+        alcançável.
+        """
+        offsets, alvos, _ = self.listas_invertidas() if invertido else self.listas()
+        visitado = [False] * self.n
+        visitado[origem] = True
+        fila = deque([origem])
+        while fila:
+            u = fila.popleft()
+            for k in range(offsets[u], offsets[u + 1]):
+                v = alvos[k]
+                if not visitado[v]:
+                    visitado[v] = True
+                    fila.append(v)
+        return visitado
+
+    def componentes_fortes(self):
+        """
+        Retorna as componentes fortemente conexas como listas de IDs densos, pelo
+        algoritmo de Tarjan em versão iterativa (pilha de chamadas explícita, sem
+        limite de recursão), em O(n + m). As arestas contam nos dois sentidos e os
+        arcos apenas no seu. As componentes saem em ordem topológica inversa.
+        """
+        offsets, alvos, _ = self.listas()
+        n = self.n
+        indice = [-1] * n
+        baixo = [0] * n
+        na_pilha = [False] * n
+        pilha = []
+        componentes = []
+        contador = 0
+
+        for raiz in range(n):
+            if indice[raiz] != -1:
+                continue
+            indice[raiz] = baixo[raiz] = contador
+            contador += 1
+            pilha.append(raiz)
+            na_pilha[raiz] = True
+            # Pilha de chamadas: vértice e posição da próxima ligação a explorar.
+            chamadas = [raiz]
+            proxima = [offsets[raiz]]
+
+            while chamadas:
+                v = chamadas[-1]
+                k = proxima[-1]
+                if k < offsets[v + 1]:
+                    proxima[-1] = k + 1
+                    w = alvos[k]
+                    if indice[w] == -1:
+                        indice[w] = baixo[w] = contador
+                        contador += 1
+                        pilha.append(w)
+                        na_pilha[w] = True
+                        chamadas.append(w)
+                        proxima.append(offsets[w])
+                    elif na_pilha[w] and indice[w] < baixo[v]:
+                        baixo[v] = indice[w]
+                    continue
+
+                # Todas as ligações de 'v' exploradas: "retorno" da chamada.
+                chamadas.pop()
+                proxima.pop()
+                if chamadas and baixo[v] < baixo[chamadas[-1]]:
+                    baixo[chamadas[-1]] = baixo[v]
+                if baixo[v] == indice[v]:
+                    componente = []
+                    while True:
+                        w = pilha.pop()
+                        na_pilha[w] = False
+                        componente.append(w)
+                        if w == v:
+                            break
+                    componentes.append(componente)
+        return componentes
+
+    def componentes_fracas(self):
+        """
+        Retorna as componentes fracamente conexas como listas de IDs densos, usando
+        union-find sobre as ligações (a direção dos arcos é ignorada).
+        """
+        pai = list(range(self.n))
+
+        def raiz(x):
+            while pai[x] != x:
+                pai[x] = pai[pai[x]]
+                x = pai[x]
+            return x
+
+        offsets, alvos, _ = self.listas()
+        for u in range(self.n):
+            for k in range(offsets[u], offsets[u + 1]):
+                ru, rv = raiz(u), raiz(alvos[k])
+                if ru != rv:
+                    pai[rv] = ru
+
+        grupos = {}
+        for x in range(self.n):
+            grupos.setdefault(raiz(x), []).append(x)
+        return list(grupos.values())
+
+
+# --- Atualização Incremental dos Caminhos Mínimos ---
+
+def _distancias_pela_ligacao(csr, a, b, custo, linhas):
+    """
+    Para as linhas (IDs densos das origens/colunas da matriz), retorna as distâncias
+    até 'a' e desde 'b' no grafo 'csr' (por um Dijkstra no grafo transposto e outro
+    no original) e a matriz T x T com o custo de ir de cada linha a cada coluna
+    passando pela ligação a -> b com custo 'custo'.
+    """
+    ate_a, seguinte, ordem_a = _dijkstra_csr(*csr.listas_invertidas(), csr.n, a)
+    desde_b, anterior, ordem_b = _dijkstra_csr(*csr.listas(), csr.n, b)
+    ate = np.array([ate_a[x] for x in linhas], dtype=np.float64)
+    desde = np.array([desde_b[x] for x in linhas], dtype=np.float64)
+    return (ate_a, seguinte, ordem_a), (desde_b, anterior, ordem_b), ate[:, None] + custo + desde[None, :]
+
+
+def _entradas_afetadas(csr, a, b, custo_antigo, D, linhas):
+    """
+    Máscara T x T das entradas (i, j) cujo caminho mínimo pode usar a ligação a -> b
+    com o custo 'custo_antigo', calculada no grafo ANTES da alteração:
+    d(i, a) + custo + d(b, j) == D[i][j]. Os empates são contados, pelo que o teste
+    é conservador: fora da máscara, nenhum caminho mínimo usava a ligação.
+    """
+    _, _, pela_ligacao = _distancias_pela_ligacao(csr, a, b, custo_antigo, linhas)
+    return (pela_ligacao == D) & np.isfinite(pela_ligacao)
+
+
+def _reparar_linha(csr, i, linhas, compacto, afetadas, linha_dist, linha_pred):
+    """
+    Repara uma linha da matriz completa depois de ligações ficarem mais caras: apenas
+    os nós marcados em 'afetadas' podem ter mudado, pelo que as suas distâncias são
+    recalculadas por um Dijkstra restrito a eles, semeado pelas ligações de entrada
+    vindas de nós não afetados (cujas distâncias continuam válidas).
+    """
+    INF = float('inf')
+    origem = linhas[i]
+    conjunto = [linhas[j] for j in np.flatnonzero(afetadas).tolist() if linhas[j] != origem]
+    em_conjunto = [False] * csr.n
+    for x in conjunto:
+        em_conjunto[x] = True
+        linha_dist[compacto[x]] = INF
+        linha_pred[compacto[x]] = -1
+
+    offsets_inv, origens_inv, pesos_inv = csr.listas_invertidas()
+    pq = []
+    for x in conjunto:
+        melhor, via = INF, -1
+        for k in range(offsets_inv[x], offsets_inv[x + 1]):
+            y = origens_inv[k]
+            if not em_conjunto[y]:
+                nova = linha_dist[compacto[y]] + pesos_inv[k]
+                if nova < melhor:
+                    melhor, via = nova, y
+        if via != -1:
+            linha_dist[compacto[x]] = melhor
+            linha_pred[compacto[x]] = compacto[via]
+            heapq.heappush(pq, (melhor, x))
+
+    offsets, alvos, pesos = csr.listas()
+    while pq:
+        d, x = heapq.heappop(pq)
+        if d > linha_dist[compacto[x]]:
+            continue
+        for k in range(offsets[x], offsets[x + 1]):
+            z = alvos[k]
+            if em_conjunto[z]:
+                nova = d + pesos[k]
+                if nova < linha_dist[compacto[z]]:
+                    linha_dist[compacto[z]] = nova
+                    linha_pred[compacto[z]] = compacto[x]
+                    heapq.heappush(pq, (nova, z))
+
+
+def _relaxar_ligacao(csr, a, b, custo, D, dist_matrix, pred_matrix, linhas, compacto):
+    """
+    Repara as matrizes, no grafo JÁ alterado, depois de a ligação a -> b ficar mais
+    barata (ou ser criada) com custo 'custo': cada entrada passa a
+    min(dist[i][j], d(i, a) + custo + d(b, j)), comparada para todas as entradas de
+    uma vez em NumPy ('D' é a cópia em array de 'dist_matrix', atualizada também).
+
+    O predecessor guardado segue a convenção de '_linha_caminhos': o último nó das
+    colunas antes de j no novo caminho, procurado primeiro no troço b -> j e depois
+    no troço i -> a.
+
+    Returns:
+        set: As linhas em que alguma distância diminuiu.
+    """
+    (ate_a, seguinte, ordem_a), (desde_b, anterior, ordem_b), pela_ligacao = \
+        _distancias_pela_ligacao(csr, a, b, custo, linhas)
+    melhora = pela_ligacao < D
+    linhas_melhoradas = np.flatnonzero(melhora.any(axis=1)).tolist()
+    if not linhas_melhoradas:
+        return set()
+
+    # Nó das colunas mais próximo de 'a' no caminho x -> a (inclusive).
+    perto_a = [-1] * csr.n
+    perto_a[a] = compacto[a]
+    for x in ordem_a[1:]:
+        s = seguinte[x]
+        perto_a[x] = perto_a[s] if perto_a[s] != -1 else compacto[x]
+    # Último nó das colunas antes de x no caminho b -> x (incluindo b).
+    antes_de = [-1] * csr.n
+    for x in ordem_b[1:]:
+        p = anterior[x]
+        antes_de[x] = compacto[p] if compacto[p] != -1 else antes_de[p]
+
+    for i in linhas_melhoradas:
+        base = ate_a[linhas[i]] + custo
+        linha_dist, linha_pred = dist_matrix[i], pred_matrix[i]
+        for j in np.flatnonzero(melhora[i]).tolist():
+            coluna = linhas[j]
+            linha_dist[j] = base + desde_b[coluna]
+            linha_pred[j] = antes_de[coluna] if antes_de[coluna] != -1 else perto_a[linhas[i]]
+    D[melhora] = pela_ligacao[melhora]
+    return set(linhas_melhoradas)
+
 
 # Definição da classe principal do grafo
 class CustomGraph:
@@ -78,6 +650,10 @@ class CustomGraph:
         self.required_edges = list(self.required_edges_info.keys())
         self.required_arcs = list(self.required_arcs_info.keys())
 
+        # Núcleo CSR imutável, usado pelos algoritmos de caminhos mínimos, graus e
+        # componentes. O dicionário 'self.graph' continua disponível por compatibilidade.
+        self.csr = GrafoCSR(parsed_data)
+
     # --- Métodos para Estatísticas (Etapa 1) ---
 
     def num_vertices(self):
@@ -114,35 +690,53 @@ class CustomGraph:
 
     def degrees(self):
         """Calcula o grau mínimo e máximo entre todos os vértices do grafo."""
-        degree = defaultdict(int)
-        for u in self.graph:
-            degree[u] += len(self.graph[u])
-        
-        for v_node in self.V:
-            if v_node not in degree:
-                degree[v_node] = 0
-                
-        return min(degree.values()), max(degree.values())
+        graus = self.csr.graus()
+        return int(graus.min()), int(graus.max())
     
     def connected_components(self):
-        """Encontra os componentes (fracamente) conectados do grafo usando BFS."""
-        visited = set()
-        components = []
-        for v_node in self.V:
-            if v_node not in visited:
-                component = []
-                q = [v_node]
-                visited.add(v_node)
-                while q:
-                    u_node = q.pop(0)
-                    component.append(u_node)
-                    for neighbor, _ in self.graph.get(u_node, []):
-                        if neighbor not in visited:
-                            visited.add(neighbor)
-                            q.append(neighbor)
-                components.append(component)
-        return components
+        """Encontra os componentes (fracamente) conectados do grafo sobre o núcleo CSR."""
+        index_to_node = self.csr.index_to_node.tolist()
+        return [[index_to_node[i] for i in componente] for componente in self.csr.componentes_fracas()]
     
+    def componentes_fortes(self):
+        """
+        Encontra as componentes fortemente conexas do grafo misto (arcos num sentido,
+        arestas nos dois) em tempo linear, sobre o núcleo CSR (ver 'GrafoCSR.componentes_fortes').
+        """
+        index_to_node = self.csr.index_to_node.tolist()
+        return [[index_to_node[i] for i in componente] for componente in self.csr.componentes_fortes()]
+
+    def servicos_inalcancaveis(self):
+        """
+        Retorna os serviços (u, v, tipo) que nenhuma rota consegue atender: aqueles cujo
+        início 'u' não é alcançável a partir do depósito ou cujo fim 'v' não permite
+        regressar ao depósito. Usa apenas duas buscas em largura a partir do depósito
+        (no grafo e no grafo transposto), em O(n + m).
+        """
+        csr = self.csr
+        deposito = csr.node_to_index[self.depot]
+        ida = csr.alcancaveis(deposito)
+        volta = csr.alcancaveis(deposito, invertido=True)
+
+        servicos = [(u, u, 'N') for u in sorted(self.required_nodes)]
+        servicos += [(u, v, 'E') for (u, v), info in self.required_edges_info.items() if (info['u'], info['v']) == (u, v)]
+        servicos += [(u, v, 'A') for (u, v) in self.required_arcs]
+        return [(u, v, tipo) for u, v, tipo in servicos
+                if not (ida[csr.node_to_index[u]] and volta[csr.node_to_index[v]])]
+
+    def verificar_alcancabilidade(self):
+        """
+        Falha cedo para instâncias inviáveis: levanta ValueError se algum serviço não
+        puder ser atendido por uma rota que parta do depósito e regresse a ele (ver
+        'servicos_inalcancaveis'). Deve ser chamada antes do cálculo de caminhos
+        mínimos, que nesses casos produziria distâncias infinitas.
+        """
+        inalcancaveis = self.servicos_inalcancaveis()
+        if inalcancaveis:
+            amostra = ', '.join(str(s) for s in inalcancaveis[:5])
+            raise ValueError(f"{len(inalcancaveis)} serviços inalcançáveis a partir do depósito {self.depot} "
+                             f"(ou sem regresso a ele): {amostra}{' ...' if len(inalcancaveis) > 5 else ''}")
+
     def average_path_length_and_diameter(self, dist):
         """Calcula o caminho médio e o diâmetro do grafo a partir da matriz de distâncias."""
         n = len(dist)
@@ -167,54 +761,269 @@ class CustomGraph:
                     curr_idx = parent_idx
         return centrality
 
+    def betweenness_brandes(self, amostras=None, semente=None):
+        """
+        Calcula a centralidade de intermediação pelo algoritmo de Brandes, diretamente
+        sobre o núcleo CSR (não precisa da matriz de predecessores). Conta todos os
+        caminhos mínimos de cada par; com 'amostras', usa apenas essa quantidade de
+        origens aleatórias (ver 'GrafoCSR.betweenness_brandes').
+        """
+        valores = self.csr.betweenness_brandes(amostras, semente)
+        return {node: valores[i] for node, i in self.csr.node_to_index.items()}
+
+    # --- Alteração de Ligações com Atualização Incremental ---
+
+    def alterar_custo(self, u, v, custo, direcionado=False, caminhos=None):
+        """
+        Altera o custo de travessia da aresta u-v (ou do arco u -> v, com
+        'direcionado=True'). Se houver ligações paralelas, altera a primeira.
+
+        Com 'caminhos' (o tuplo devolvido por 'all_pairs_dijkstra', completo ou só de
+        terminais, com as matrizes em listas), as matrizes são reparadas no próprio
+        objeto em vez de recalculadas (ver '_atualizar_caminhos').
+
+        Returns:
+            set: Índices das linhas da matriz que podem ter mudado (ver 'reprecificar_rotas').
+        """
+        ligacoes = self.arcs if direcionado else self.edges
+        k = self._procurar_ligacao(ligacoes, u, v, direcionado)
+        a, b, antigo = ligacoes[k]
+        ligacoes[k] = (a, b, custo)
+        self._substituir_adjacencia(a, b, antigo, custo, direcionado)
+
+        infos = self.required_arcs_info if direcionado else self.required_edges_info
+        for chave in ((a, b),) if direcionado else ((a, b), (b, a)):
+            if chave in infos:
+                infos[chave] = dict(infos[chave], cost=custo)
+        return self._atualizar_caminhos(a, b, direcionado, caminhos)
+
+    def adicionar_ligacao(self, u, v, custo, direcionado=False, caminhos=None):
+        """
+        Acrescenta uma aresta (ou arco) não requerida entre dois nós existentes. Ver
+        'alterar_custo' para 'caminhos' e para o valor devolvido.
+        """
+        if u not in self.V or v not in self.V:
+            raise ValueError(f"Os nós {u} e {v} têm de existir no grafo (crie um novo grafo para acrescentar nós).")
+        (self.arcs if direcionado else self.edges).append((u, v, custo))
+        self._substituir_adjacencia(u, v, None, custo, direcionado)
+        return self._atualizar_caminhos(u, v, direcionado, caminhos)
+
+    def remover_ligacao(self, u, v, direcionado=False, caminhos=None):
+        """
+        Remove uma aresta (ou arco) não requerida; as ligações requeridas são serviços e
+        não podem ser removidas. Ver 'alterar_custo' para 'caminhos' e para o valor devolvido.
+        """
+        ligacoes = self.arcs if direcionado else self.edges
+        k = self._procurar_ligacao(ligacoes, u, v, direcionado)
+        a, b, antigo = ligacoes[k]
+        if (a, b) in (self.required_arcs_info if direcionado else self.required_edges_info):
+            raise ValueError(f"A ligação ({a}, {b}) é requerida e não pode ser removida.")
+        del ligacoes[k]
+        self._substituir_adjacencia(a, b, antigo, None, direcionado)
+        return self._atualizar_caminhos(a, b, direcionado, caminhos)
+
+    @staticmethod
+    def _procurar_ligacao(ligacoes, u, v, direcionado):
+        """ Posição da primeira ligação u-v (em qualquer sentido, se for aresta). """
+        for k, (a, b, _) in enumerate(ligacoes):
+            if (a, b) == (u, v) or (not direcionado and (a, b) == (v, u)):
+                return k
+        raise ValueError(f"Não existe {'arco' if direcionado else 'aresta'} ({u}, {v}) no grafo.")
+
+    def _substituir_adjacencia(self, u, v, antigo, novo, direcionado):
+        """ Atualiza 'self.graph': troca (ou remove, com 'novo=None', ou acrescenta, com 'antigo=None'). """
+        for x, y in ((u, v),) if direcionado else ((u, v), (v, u)):
+            vizinhos = self.graph[x]
+            if antigo is None:
+                vizinhos.append((y, novo))
+                continue
+            k = vizinhos.index((y, antigo))
+            if novo is None:
+                del vizinhos[k]
+            else:
+                vizinhos[k] = (y, novo)
+
+    def _atualizar_caminhos(self, u, v, direcionado, caminhos):
+        """
+        Reconstrói o núcleo CSR depois de uma alteração na ligação u-v e, com
+        'caminhos', repara as matrizes de 'all_pairs_dijkstra' com atualização dinâmica
+        de caminhos mínimos, considerando cada sentido a -> b afetado pelo seu custo
+        efetivo (o menor entre ligações paralelas):
+
+        - Se o custo subiu (ou a ligação foi removida), só mudam as entradas cujos
+          caminhos mínimos usavam a ligação ('_entradas_afetadas', no grafo antigo).
+          Na matriz completa, cada linha afetada é reparada por um Dijkstra restrito
+          a esses nós ('_reparar_linha'); na matriz de terminais, que não guarda as
+          distâncias aos restantes nós, as linhas afetadas são recalculadas inteiras.
+        - Se o custo desceu (ou a ligação é nova), as distâncias são relaxadas através
+          da ligação em O(T²) ('_relaxar_ligacao'), sem nenhum Dijkstra por linha.
+
+        As distâncias ficam iguais às de um cálculo de raiz; em caso de empate, o
+        predecessor guardado pode ser outro caminho mínimo do mesmo custo.
+
+        Returns:
+            set: Índices das linhas que foram recalculadas ou em que alguma distância diminuiu.
+        """
+        antigo = self.csr
+        novo = GrafoCSR.de_ligacoes(self.V, self.edges, self.arcs)
+        self.csr = novo
+        if caminhos is None:
+            return set()
+
+        dist_matrix, pred_matrix, _, index_to_node = caminhos
+        linhas = [novo.node_to_index[index_to_node[i]] for i in range(len(dist_matrix))]
+        compacto = [-1] * novo.n
+        for i, x in enumerate(linhas):
+            compacto[x] = i
+
+        a, b = novo.node_to_index[u], novo.node_to_index[v]
+        sentidos = [(a, b)] if direcionado or a == b else [(a, b), (b, a)]
+        subidas, descidas = [], []
+        for x, y in sentidos:
+            custo_antigo, custo_novo = antigo.custo_ligacao(x, y), novo.custo_ligacao(x, y)
+            if custo_novo > custo_antigo:
+                subidas.append((x, y, custo_antigo))
+            elif custo_novo < custo_antigo:
+                descidas.append((x, y, custo_novo))
+
+        if not subidas and not descidas:
+            return set()
+        D = np.array(dist_matrix, dtype=np.float64)
+
+        alteradas = set()
+        if subidas:
+            afetadas = np.zeros(D.shape, dtype=bool)
+            for x, y, custo_antigo in subidas:
+                afetadas |= _entradas_afetadas(antigo, x, y, custo_antigo, D, linhas)
+            completa = len(linhas) == novo.n
+            listas = novo.listas()
+            for i in np.flatnonzero(afetadas.any(axis=1)).tolist():
+                if completa:
+                    _reparar_linha(novo, i, linhas, compacto, afetadas[i], dist_matrix[i], pred_matrix[i])
+                else:
+                    dist_matrix[i], pred_matrix[i] = _linha_caminhos(listas, novo.n, linhas[i], i, linhas, compacto)
+                D[i] = dist_matrix[i]
+                alteradas.add(i)
+        for x, y, custo_novo in descidas:
+            alteradas |= _relaxar_ligacao(novo, x, y, custo_novo, D, dist_matrix, pred_matrix, linhas, compacto)
+        return alteradas
+
     # --- Algoritmo Otimizado para Caminhos Mínimos ---
 
-    def all_pairs_dijkstra(self):
+    def terminais(self):
+        """
+        Retorna a lista ordenada dos nós terminais: o depósito e as extremidades de
+        todos os serviços requeridos. São os únicos nós cujas distâncias são lidas
+        pelo construtivo e pela busca local.
+        """
+        terminais = {self.depot}
+        terminais.update(self.required_nodes)
+        for u, v in self.required_edges:
+            terminais.add(u)
+            terminais.add(v)
+        for u, v in self.required_arcs:
+            terminais.add(u)
+            terminais.add(v)
+        return sorted(terminais)
+
+    def all_pairs_dijkstra(self, apenas_terminais=False, processos=1):
         """
         Calcula a matriz de caminhos mínimos para todos os pares. Utiliza o algoritmo de
         Dijkstra a partir de cada nó, uma abordagem eficiente para os grafos esparsos do trabalho.
+
+        Com 'apenas_terminais=True', o Dijkstra é executado apenas a partir dos nós
+        terminais (ver 'terminais') e as matrizes ficam compactas (terminais x terminais).
+        O contrato de retorno é o mesmo: 'dist_matrix[node_to_index[a]][node_to_index[b]]'
+        continua válido para quaisquer terminais 'a' e 'b', pelo que o construtivo e a
+        busca local aceitam a matriz compacta sem alterações. Neste modo,
+        'pred_matrix[i][j]' guarda o índice do último terminal antes de 'j' no caminho
+        mínimo a partir de 'i' (ou 'i', se o caminho não passar por outro terminal).
+
+        Com 'processos > 1', as origens são repartidas por vários processos, que
+        escrevem as suas linhas diretamente num buffer de memória partilhada (ver
+        '_all_pairs_paralelo'). O resultado é o mesmo, incluindo os tipos das distâncias
+        (ver 'distancias_em_listas').
         """
-        nodes = sorted(list(self.V))
+        csr = self.csr
+        if apenas_terminais:
+            nodes = self.terminais()
+            origens = [csr.node_to_index[node] for node in nodes]
+            # Índice compacto de cada vértice do CSR (-1 para os que não são terminais).
+            colunas = origens
+            compacto = [-1] * csr.n
+            for i, t in enumerate(origens):
+                compacto[t] = i
+        else:
+            # Como o CSR já usa IDs densos, as linhas devolvidas pelo Dijkstra são
+            # diretamente as linhas das matrizes.
+            nodes = csr.index_to_node.tolist()
+            origens = list(range(csr.n))
+            colunas = compacto = None
+
         node_to_index = {node: i for i, node in enumerate(nodes)}
         index_to_node = {i: node for i, node in enumerate(nodes)}
-        n = len(nodes)
-        
-        INF = float('inf')
-        dist_matrix = [[INF] * n for _ in range(n)]
-        pred_matrix = [[-1] * n for _ in range(n)]
-
-        # Executa o Dijkstra para cada nó do grafo como origem.
-        for start_node_val in nodes:
-            start_node_idx = node_to_index[start_node_val]
-            
-            # Algoritmo de Dijkstra padrão com fila de prioridade (heapq).
-            dist = {node: INF for node in self.V}
-            pred = {node: -1 for node in self.V}
-            dist[start_node_val] = 0
-            pq = [(0, start_node_val)]
 
-            while pq:
-                d, u = heapq.heappop(pq)
-                if d > dist[u]:
-                    continue
+        if processos > 1 and len(origens) > 1:
+            dist_matrix, pred_matrix = self._all_pairs_paralelo(origens, colunas, compacto, processos)
+            return dist_matrix, pred_matrix, node_to_index, index_to_node
 
-                for v, weight in self.graph.get(u, []):
-                    if dist[u] + weight < dist[v]:
-                        dist[v] = dist[u] + weight
-                        pred[v] = u
-                        heapq.heappush(pq, (dist[v], v))
-            
-            # Preenche as matrizes de resultado para o nó de início atual
-            for end_node_val in nodes:
-                end_node_idx = node_to_index[end_node_val]
-                dist_matrix[start_node_idx][end_node_idx] = dist[end_node_val]
-                if pred[end_node_val] != -1:
-                    pred_matrix[start_node_idx][end_node_idx] = node_to_index[pred[end_node_val]]
-                elif dist[end_node_val] == 0:
-                    pred_matrix[start_node_idx][end_node_idx] = start_node_idx
+        n = len(nodes)
+        dist_matrix = [None] * n
+        pred_matrix = [None] * n
+        listas = csr.listas()
+
+        # Executa o Dijkstra para cada nó de origem.
+        for start_node_idx, origem in enumerate(origens):
+            dist_matrix[start_node_idx], pred_matrix[start_node_idx] = _linha_caminhos(
+                listas, csr.n, origem, start_node_idx, colunas, compacto
+            )
         
         return dist_matrix, pred_matrix, node_to_index, index_to_node
 
+    def _all_pairs_paralelo(self, origens, colunas, compacto, processos):
+        """
+        Reparte as origens do 'all_pairs_dijkstra' por um conjunto de processos.
+        Cada processo recebe o CSR uma única vez (na inicialização) e escreve as linhas
+        que calcula nos buffers partilhados de distâncias e predecessores, pelo que
+        nenhum resultado precisa de ser serializado de volta para o processo principal.
+        """
+        csr = self.csr
+        forma = (len(origens), len(origens) if colunas is not None else csr.n)
+        celulas = max(1, forma[0] * forma[1])
+        shm_dist = shared_memory.SharedMemory(create=True, size=celulas * 8)
+        shm_pred = shared_memory.SharedMemory(create=True, size=celulas * 4)
+        try:
+            # Blocos pequenos equilibram a carga entre processos (as origens têm custos diferentes).
+            tarefas = list(enumerate(origens))
+            tamanho_bloco = max(1, len(tarefas) // (processos * 8))
+            blocos = [tarefas[i:i + tamanho_bloco] for i in range(0, len(tarefas), tamanho_bloco)]
+
+            initargs = (csr.listas(), csr.n, colunas, compacto, shm_dist.name, shm_pred.name, forma)
+            with multiprocessing.Pool(processos, initializer=_iniciar_trabalhador, initargs=initargs) as pool:
+                for _ in pool.imap_unordered(_calcular_linhas, blocos):
+                    pass
+
+            dist_matrix = distancias_em_listas(np.ndarray(forma, dtype=np.float64, buffer=shm_dist.buf))
+            pred_matrix = np.ndarray(forma, dtype=np.int32, buffer=shm_pred.buf).tolist()
+        finally:
+            shm_dist.close()
+            shm_dist.unlink()
+            shm_pred.close()
+            shm_pred.unlink()
+        return dist_matrix, pred_matrix
+
+# --- Consulta de Distâncias ---
+
+def consulta_distancia(dist_matrix, node_to_index):
+    """
+    Cria uma função 'distancia(a, b)' que devolve o custo do caminho mínimo entre os
+    nós 'a' e 'b', escondendo a tradução de IDs de nó para índices de matriz.
+    Funciona tanto com a matriz completa como com a matriz compacta de terminais.
+    """
+    def distancia(a, b):
+        return dist_matrix[node_to_index[a]][node_to_index[b]]
+    return distancia
+
 # --- Função Auxiliar para Visualização ---
 
 def desenhar_grafo(grafo):
@@ -1,8 +1,12 @@
 # ARQUIVO: instancia.py
 
 # Imports necessários
+import json
+import os
 import re
 
+import numpy as np
+
 def parse_instance(file_path: str):
     """
     Lê e interpreta um ficheiro de instância do problema (.dat), extraindo os seus
@@ -101,3 +105,184 @@ def parse_instance(file_path: str):
             continue
             
     return data
+
+
+# --- Leitura Rápida (Colunar) e Forma Compilada ---
+
+# Colunas de cada secção, na ordem em que aparecem no ficheiro .dat (após o rótulo).
+COLUNAS_SECOES = {
+    "ReN": ('id', 'demand', 'cost'),
+    "ReE": ('u', 'v', 'cost', 'demand', 'scost'),
+    "ReA": ('u', 'v', 'cost', 'demand', 'scost'),
+    "NrE": ('u', 'v', 'cost'),
+    "NrA": ('u', 'v', 'cost'),
+}
+
+# Cabeçalho de secção (primeiro token da linha) -> chave do dicionário de dados.
+_CABECALHOS = {"ReN.": "ReN", "ReE.": "ReE", "ReA.": "ReA", "EDGE": "NrE", "ARC": "NrA"}
+
+# Prefixo do rótulo das linhas de dados de cada secção.
+_PREFIXOS = {"ReN": "N", "ReE": "E", "ReA": "A", "NrE": "NrE", "NrA": "NrA"}
+
+
+def _ler_metadado(line, meta):
+    """ Interpreta uma linha 'Chave: valor' do cabeçalho, tal como 'parse_instance'. """
+    if ":" not in line:
+        return
+    key, value = [p.strip() for p in line.split(":", 1)]
+    if key == 'Name':
+        meta["name"] = value
+    elif key == 'Capacity':
+        meta["capacity"] = int(value)
+    elif key == 'Depot Node':
+        meta["depot"] = int(value)
+    elif key.startswith("#"):
+        meta[key] = int(value)
+
+
+def _montar_dados(meta, tabelas, com_dicionarios):
+    """
+    Monta o dicionário de dados a partir das tabelas (arrays n x k) de cada secção.
+    As colunas ficam em 'data["colunas"][secao][coluna]' e, com 'com_dicionarios',
+    as secções são também expostas no formato de 'parse_instance' (lista de dicts).
+    """
+    data = {"meta": meta, "colunas": {}}
+    for secao, nomes in COLUNAS_SECOES.items():
+        tabela = tabelas[secao]
+        data["colunas"][secao] = {nome: tabela[:, i] for i, nome in enumerate(nomes)}
+        if com_dicionarios:
+            data[secao] = [dict(zip(nomes, linha)) for linha in tabela.tolist()]
+    return data
+
+
+def parse_instance_rapido(file_path: str, com_dicionarios=True):
+    """
+    Versão rápida de 'parse_instance': lê o ficheiro numa única passagem, sem
+    expressões regulares, identificando a secção e o tipo de linha pelo primeiro token.
+
+    Além do formato de 'parse_instance' (listas de dicionários por secção), devolve em
+    'data["colunas"]' os dados de cada secção como arrays NumPy por coluna
+    (por exemplo, 'data["colunas"]["ReE"]["u"]').
+
+    Args:
+        file_path (str): O caminho para o ficheiro .dat da instância.
+        com_dicionarios (bool): Se False, omite as listas de dicionários e devolve
+            apenas os metadados e as colunas (ainda mais rápido).
+
+    Returns:
+        dict: Os metadados, as colunas e (opcionalmente) as listas de dicionários.
+    """
+    with open(file_path, 'r') as f:
+        texto = f.read()
+
+    meta = {}
+    valores = {secao: [] for secao in COLUNAS_SECOES}
+    secao = None
+    prefixo = None
+    destino = None
+    largura = 0
+
+    for line in texto.splitlines():
+        parts = line.split()
+        if not parts:
+            continue
+        token = parts[0]
+
+        nova_secao = _CABECALHOS.get(token)
+        if nova_secao is not None:
+            secao = nova_secao
+            prefixo = _PREFIXOS[secao]
+            destino = valores[secao]
+            largura = len(COLUNAS_SECOES[secao])
+            continue
+
+        if secao is None:
+            _ler_metadado(line, meta)
+            continue
+
+        # Linhas de dados: rótulo com o prefixo da secção seguido das colunas numéricas.
+        # Qualquer outra linha (texto final do ficheiro, por exemplo) é ignorada.
+        if not token.startswith(prefixo):
+            continue
+        try:
+            if secao == "ReN":
+                linha = (int(token[1:]), int(parts[1]), int(parts[2]))
+            elif len(parts) == largura + 1:
+                linha = tuple(map(int, parts[1:]))
+            else:
+                continue
+        except (ValueError, IndexError):
+            continue
+        destino.extend(linha)
+
+    tabelas = {
+        secao: np.array(valores[secao], dtype=np.int64).reshape(-1, len(nomes))
+        for secao, nomes in COLUNAS_SECOES.items()
+    }
+    return _montar_dados(meta, tabelas, com_dicionarios)
+
+
+# Identificador e versão do formato compilado (primeiro inteiro do ficheiro).
+_MAGICO_COMPILADO = 0x4D434752500001
+
+
+def salvar_instancia_compilada(data, caminho):
+    """
+    Guarda uma instância lida por 'parse_instance_rapido' numa forma binária compacta.
+
+    O ficheiro é um único bloco de inteiros de 64 bits: o identificador do formato, o
+    número de linhas de cada secção e o tamanho dos metadados, seguidos das tabelas de
+    cada secção (linha a linha) e dos metadados em JSON. A leitura é feita com uma
+    única chamada de I/O e sem cópias ('np.frombuffer').
+    """
+    tabelas = [
+        np.column_stack([data["colunas"][secao][nome] for nome in nomes]).reshape(-1, len(nomes))
+        for secao, nomes in COLUNAS_SECOES.items()
+    ]
+    meta = json.dumps(data["meta"]).encode('utf-8')
+    cabecalho = np.array([_MAGICO_COMPILADO] + [len(t) for t in tabelas] + [len(meta)], dtype=np.int64)
+
+    tmp = caminho + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(cabecalho.tobytes())
+        for tabela in tabelas:
+            f.write(np.ascontiguousarray(tabela, dtype=np.int64).tobytes())
+        f.write(meta)
+    os.replace(tmp, caminho)
+
+
+def carregar_instancia_compilada(caminho, com_dicionarios=True):
+    """ Lê uma instância guardada por 'salvar_instancia_compilada'. """
+    with open(caminho, 'rb') as f:
+        conteudo = f.read()
+
+    num_secoes = len(COLUNAS_SECOES)
+    cabecalho = np.frombuffer(conteudo, dtype=np.int64, count=num_secoes + 2)
+    if cabecalho[0] != _MAGICO_COMPILADO:
+        raise ValueError(f"Ficheiro compilado inválido ou de outra versão: {caminho}")
+
+    tabelas = {}
+    posicao = cabecalho.nbytes
+    for (secao, nomes), linhas in zip(COLUNAS_SECOES.items(), cabecalho[1:-1].tolist()):
+        contagem = linhas * len(nomes)
+        tabelas[secao] = np.frombuffer(conteudo, dtype=np.int64, count=contagem, offset=posicao).reshape(-1, len(nomes))
+        posicao += contagem * 8
+    meta = json.loads(conteudo[posicao:posicao + int(cabecalho[-1])].decode('utf-8'))
+    return _montar_dados(meta, tabelas, com_dicionarios)
+
+
+def parse_instance_compilada(file_path: str, diretorio_compilado, com_dicionarios=True):
+    """
+    Lê uma instância usando o cache de formas compiladas em 'diretorio_compilado'.
+    A forma compilada é usada se existir e for mais recente do que o ficheiro .dat;
+    caso contrário, a instância é lida com 'parse_instance_rapido' e compilada.
+    """
+    nome = os.path.splitext(os.path.basename(file_path))[0]
+    caminho = os.path.join(diretorio_compilado, nome + '.bin')
+    if os.path.exists(caminho) and os.path.getmtime(caminho) >= os.path.getmtime(file_path):
+        return carregar_instancia_compilada(caminho, com_dicionarios)
+
+    data = parse_instance_rapido(file_path, com_dicionarios)
+    os.makedirs(diretorio_compilado, exist_ok=True)
+    salvar_instancia_compilada(data, caminho)
+    return data
@@ -0,0 +1,290 @@
+# ARQUIVO: metaheuristica.py
+"""
+Busca local iterada (ILS) com aceitação opcional por recozimento simulado (SA), e
+busca com múltiplos inícios em paralelo.
+
+O ciclo perturbação -> busca local -> aceitação repete-se até esgotar um orçamento de
+tempo de relógio ou de iterações, mantendo sempre a melhor solução encontrada e o
+instante exato (desde o início da execução) em que ela apareceu, que é o valor
+reportado como 'clocks_melhor_sol'.
+"""
+
+# Imports necessários
+import math
+import random
+import time
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import telemetria
+from grafo import distancias_inteiras
+from solucao import Rota, TabelaServicos, construtivo_split
+from otimizacao import ContextoBusca, vnd
+
+
+def perturbar(solucao, ctx, rng, forca):
+    """
+    Perturbação aleatória: move 'forca' serviços, escolhidos ao acaso, para posições
+    aleatórias de outras rotas onde caibam (abrindo uma rota nova se não couberem em
+    nenhuma). A solução é alterada no próprio objeto.
+    """
+    rotas = solucao.rotas
+    demanda = ctx.tabela.demanda
+    alteradas = set()
+
+    for _ in range(forca):
+        origens = [i for i, rota in enumerate(rotas) if rota.servicos_realizados]
+        a = rng.choice(origens)
+        servicos_a = rotas[a].servicos_realizados
+        servico = servicos_a.pop(rng.randrange(len(servicos_a)))
+        d = demanda[servico[0] - 1]
+        rotas[a].carga_total -= d
+
+        destinos = [b for b, rota in enumerate(rotas) if b != a and rota.carga_total + d <= rota.capacidade_maxima]
+        if destinos:
+            b = rng.choice(destinos)
+        else:
+            rotas.append(Rota(ctx.grafo.depot, ctx.grafo.capacity))
+            b = len(rotas) - 1
+        servicos_b = rotas[b].servicos_realizados
+        servicos_b.insert(rng.randint(0, len(servicos_b)), servico)
+        rotas[b].carga_total += d
+        alteradas.update((a, b))
+
+    ctx.recalcular(solucao, *alteradas)
+    return solucao
+
+
+def busca_local_iterada(solucao_inicial, grafo, servicos_info, dist_matrix, node_to_index,
+                        tempo_limite=None, max_iteracoes=None, busca_local=None, forca_perturbacao=3,
+                        temperatura_inicial=0.0, resfriamento=0.95, semente=None, inicio=None):
+    """
+    Metaheurística "anytime" em torno das buscas locais de 'otimizacao.py'.
+
+    A cada iteração, a solução corrente é copiada, perturbada ('perturbar') e otimizada
+    por 'busca_local'. A nova solução substitui a corrente se não for pior ou, com
+    'temperatura_inicial' > 0, com probabilidade exp(-delta / T) (recozimento simulado,
+    com T multiplicado por 'resfriamento' a cada iteração). A melhor solução é guardada
+    como instantâneo compacto ('Solucao.compactar').
+
+    O orçamento é verificado entre iterações, pelo que a última iteração pode exceder
+    ligeiramente 'tempo_limite'.
+
+    Args:
+        solucao_inicial (Solucao): Solução de partida (não é alterada).
+        grafo (CustomGraph): O objeto do grafo.
+        servicos_info (dict | TabelaServicos): Informações detalhadas de cada serviço.
+        dist_matrix (list[list]): Matriz de caminhos mínimos pré-calculada.
+        node_to_index (dict): Mapeamento de ID de nó para índice de matriz.
+        tempo_limite (float | None): Orçamento de tempo de relógio, em segundos, contado
+            a partir de 'inicio'.
+        max_iteracoes (int | None): Orçamento de iterações (perturbação + busca local).
+        busca_local (callable | None): Função 'f(solucao) -> Solucao'. Por padrão, o VND
+            com first improvement.
+        forca_perturbacao (int): Número de serviços movidos em cada perturbação.
+        temperatura_inicial (float): Temperatura inicial do critério de aceitação (0
+            aceita apenas soluções não piores).
+        resfriamento (float): Fator de redução da temperatura por iteração.
+        semente (int | None): Semente do gerador aleatório, para execuções reprodutíveis.
+        inicio (float | None): Instante de referência ('time.perf_counter()') para o
+            orçamento e para o registo do tempo da melhor solução. Por padrão, o momento
+            da chamada; o pipeline passa o início da execução da instância.
+
+    Returns:
+        Solucao: A melhor solução encontrada, com 'tempo_melhor_sol' preenchido (em
+        microssegundos desde 'inicio').
+    """
+    if tempo_limite is None and max_iteracoes is None:
+        raise ValueError("Indique um orçamento: 'tempo_limite' e/ou 'max_iteracoes'.")
+
+    inicio = time.perf_counter() if inicio is None else inicio
+    rng = random.Random(semente)
+    tabela = TabelaServicos.de(servicos_info, node_to_index)
+    ctx = ContextoBusca(grafo, tabela, dist_matrix, node_to_index)
+    if busca_local is None:
+        def busca_local(solucao):
+            return vnd(solucao, grafo, tabela, dist_matrix, node_to_index, politica='primeira')
+
+    def esgotado(iteracao):
+        if max_iteracoes is not None and iteracao >= max_iteracoes:
+            return True
+        return tempo_limite is not None and time.perf_counter() - inicio >= tempo_limite
+
+    atual = busca_local(solucao_inicial)
+    melhor = atual.compactar()
+    tempo_melhor = time.perf_counter() - inicio
+    temperatura = temperatura_inicial
+
+    iteracao = 0
+    while not esgotado(iteracao):
+        iteracao += 1
+        candidata = busca_local(perturbar(atual.copiar(), ctx, rng, forca_perturbacao))
+
+        if candidata.custo_total < melhor.custo_total:
+            if telemetria.ATIVA:
+                telemetria.registar_melhoria('ils', candidata.custo_total - melhor.custo_total)
+            melhor = candidata.compactar()
+            tempo_melhor = time.perf_counter() - inicio
+
+        delta = candidata.custo_total - atual.custo_total
+        if delta <= 0 or (temperatura > 0 and rng.random() < math.exp(-delta / temperatura)):
+            atual = candidata
+        temperatura *= resfriamento
+
+    telemetria.contar('ils.iteracoes', iteracao)
+    solucao = melhor.para_solucao([None] + tabela.servicos, grafo.depot, grafo.capacity)
+    solucao.tempo_melhor_sol = tempo_melhor * 1_000_000
+    return solucao
+
+
+# --- Múltiplos Inícios em Paralelo ---
+
+# Estado de cada processo trabalhador do multi-início (preenchido por '_iniciar_trabalhador').
+_TRABALHADOR = {}
+
+def _iniciar_trabalhador(grafo, tabela, node_to_index, nome_dist, forma, opcoes):
+    """
+    Liga o processo trabalhador à matriz de distâncias em memória partilhada, sem a
+    copiar: cada linha é um 'memoryview' de floats sobre o segmento partilhado, pelo
+    que 'dist[i][j]' devolve um float Python (tão ou mais depressa do que numa lista
+    de listas, e ao contrário de indexar um ndarray, que devolve np.float64). O
+    segmento fica aberto em '_TRABALHADOR' enquanto o processo existir.
+    """
+    shm = shared_memory.SharedMemory(name=nome_dist)
+    linhas, colunas = forma
+    plano = shm.buf[:linhas * colunas * 8].cast('d')
+    dist = [plano[i * colunas:(i + 1) * colunas] for i in range(linhas)]
+    _TRABALHADOR.update(grafo=grafo, tabela=tabela, node_to_index=node_to_index, dist=dist, opcoes=opcoes, shm=shm)
+    if opcoes['recolher_contadores']:
+        telemetria.ativar()
+
+def _trajetoria(tarefa):
+    """
+    Executa um início: construtivo aleatório (tour gigante com lista restrita de
+    candidatos + Split) ou, no início 0, a solução inicial fornecida, seguido da busca
+    local iterada ou, sem orçamento, do VND. Todo o acaso vem da semente do início,
+    pelo que o resultado é reprodutível.
+    Num processo trabalhador com a telemetria ativa, os contadores do início são
+    devolvidos nas estatísticas (chave 'contadores'), para o processo principal os somar.
+    """
+    indice, semente, inicio = tarefa
+    t = _TRABALHADOR
+    grafo, tabela, dist, n2i, opcoes = t['grafo'], t['tabela'], t['dist'], t['node_to_index'], t['opcoes']
+    tempo_inicio = time.perf_counter()
+    if opcoes['recolher_contadores']:
+        telemetria.reiniciar()
+
+    rng = random.Random(semente)
+    if indice == 0 and opcoes['inicial'] is not None:
+        inicial = opcoes['inicial'].para_solucao([None] + tabela.servicos, grafo.depot, grafo.capacity)
+    else:
+        inicial = construtivo_split(grafo, tabela, dist, n2i, rng=rng, tamanho_rcl=opcoes['tamanho_rcl'])
+    if opcoes['tempo_limite'] is not None or opcoes['max_iteracoes'] is not None:
+        solucao = busca_local_iterada(inicial, grafo, tabela, dist, n2i, tempo_limite=opcoes['tempo_limite'],
+                                      max_iteracoes=opcoes['max_iteracoes'], semente=semente, inicio=tempo_inicio)
+        instante_melhor = tempo_inicio + solucao.tempo_melhor_sol / 1_000_000
+    else:
+        solucao = vnd(inicial, grafo, tabela, dist, n2i, politica='primeira')
+        instante_melhor = time.perf_counter()
+
+    estatisticas = {
+        'inicio': indice,
+        'semente': semente,
+        'custo_inicial': inicial.custo_total,
+        'custo': solucao.custo_total,
+        'rotas': len(solucao.rotas),
+        'tempo': time.perf_counter() - tempo_inicio,
+        # 'perf_counter' é um relógio monotónico do sistema, comum a todos os processos.
+        'tempo_melhor_sol': (instante_melhor - inicio) * 1_000_000,
+    }
+    if opcoes['recolher_contadores']:
+        estatisticas['contadores'] = telemetria.exportar()['contadores']
+    return estatisticas, solucao.compactar()
+
+
+def multi_inicio(grafo, servicos_info, dist_matrix, node_to_index, num_inicios=None, processos=None, semente=0,
+                 tempo_limite=None, max_iteracoes=None, tamanho_rcl=3, inicio=None, solucao_inicial=None):
+    """
+    Busca com múltiplos inícios independentes, repartidos por um conjunto de processos.
+
+    O início i usa a semente 'semente + i' e não depende de nenhum outro, pelo que, com
+    um orçamento de iterações (ou sem orçamento), o resultado é o mesmo para qualquer
+    número de processos. Com 'tempo_limite', cada trajetória pode avançar mais ou menos
+    consoante a carga da máquina.
+
+    A matriz de distâncias é copiada uma única vez para memória partilhada, onde todos
+    os processos a leem sem cópias próprias, e a tabela de serviços e o grafo são
+    enviados uma única vez a cada processo (na inicialização); cada início devolve
+    apenas as suas estatísticas e um instantâneo compacto da solução. Com um único
+    processo, os inícios usam 'dist_matrix' diretamente.
+
+    Args:
+        grafo (CustomGraph): O objeto do grafo.
+        servicos_info (dict | TabelaServicos): Informações detalhadas de cada serviço.
+        dist_matrix (list[list]): Matriz de caminhos mínimos pré-calculada.
+        node_to_index (dict): Mapeamento de ID de nó para índice de matriz.
+        num_inicios (int | None): Número de inícios (padrão: número de processos).
+        processos (int | None): Número de processos (padrão: número de núcleos). Com 1,
+            os inícios correm no próprio processo.
+        semente (int): Semente base.
+        tempo_limite (float | None): Orçamento de tempo, em segundos, de cada início.
+        max_iteracoes (int | None): Orçamento de iterações da busca local iterada de cada início.
+        tamanho_rcl (int): Tamanho da lista restrita de candidatos do construtivo.
+        inicio (float | None): Instante de referência ('time.perf_counter()') para o
+            tempo da melhor solução. Por padrão, o momento da chamada.
+        solucao_inicial (Solucao | None): Se indicada, o início 0 parte desta solução
+            (warm start) em vez do construtivo aleatório.
+
+    Returns:
+        tuple: (melhor_solucao, estatisticas). 'estatisticas' é uma lista, por ordem dos
+        inícios, de dicionários com a semente, os custos inicial e final, o número de
+        rotas, a duração e o instante em que a melhor solução do início apareceu (e,
+        com a telemetria ativa e vários processos, os contadores do início).
+    """
+    inicio = time.perf_counter() if inicio is None else inicio
+    processos = processos or multiprocessing.cpu_count()
+    num_inicios = num_inicios or processos
+    tabela = TabelaServicos.de(servicos_info, node_to_index)
+    opcoes = {'tempo_limite': tempo_limite, 'max_iteracoes': max_iteracoes, 'tamanho_rcl': tamanho_rcl,
+              'inicial': solucao_inicial.compactar() if solucao_inicial is not None else None,
+              'recolher_contadores': False}
+    tarefas = [(i, semente + i, inicio) for i in range(num_inicios)]
+
+    if processos == 1:
+        _TRABALHADOR.update(grafo=grafo, tabela=tabela, node_to_index=node_to_index, dist=dist_matrix, opcoes=opcoes)
+        try:
+            resultados = [_trajetoria(tarefa) for tarefa in tarefas]
+        finally:
+            _TRABALHADOR.clear()
+    else:
+        dist = np.asarray(dist_matrix, dtype=np.float64)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, dist.nbytes))
+        try:
+            np.ndarray(dist.shape, dtype=np.float64, buffer=shm.buf)[:] = dist
+            # A telemetria é global a cada processo: os trabalhadores contam à parte.
+            opcoes['recolher_contadores'] = telemetria.ATIVA
+            initargs = (grafo, tabela, node_to_index, shm.name, dist.shape, opcoes)
+            with multiprocessing.Pool(min(processos, num_inicios), initializer=_iniciar_trabalhador,
+                                      initargs=initargs) as pool:
+                resultados = pool.map(_trajetoria, tarefas, chunksize=1)
+        finally:
+            shm.close()
+            shm.unlink()
+        # Os trabalhadores leem a matriz em float; com custos inteiros, os custos voltam
+        # a ser 'int', como quando os inícios correm no próprio processo.
+        if distancias_inteiras(dist):
+            for estat, compacta in resultados:
+                estat['custo_inicial'], estat['custo'] = int(estat['custo_inicial']), int(estat['custo'])
+                compacta.custo_total = int(compacta.custo_total)
+
+    # Melhor custo; em caso de empate, o início de menor índice.
+    estatisticas = [e for e, _ in resultados]
+    for estat in estatisticas:
+        for nome, quantidade in estat.get('contadores', {}).items():
+            telemetria.contar(nome, quantidade)
+    melhor_estat, melhor = min(resultados, key=lambda r: (r[0]['custo'], r[0]['inicio']))
+    solucao = melhor.para_solucao([None] + tabela.servicos, grafo.depot, grafo.capacity)
+    solucao.tempo_melhor_sol = melhor_estat['tempo_melhor_sol']
+    return solucao, estatisticas
@@ -1,8 +1,121 @@
 # ARQUIVO: otimizacao.py
 
-import copy
+import numpy as np
 
-def swap_entre_rotas(solucao_obj, grafo, servicos_info, dist_matrix, node_to_index):
+import telemetria
+from solucao import TabelaServicos
+
+
+class VizinhosGranulares:
+    """
+    Listas granulares da troca entre rotas, calculadas por 'calcular_vizinhos_granulares'.
+
+    Trocar 'a' por 'b' põe 'b' no lugar de 'a', entre o predecessor e o sucessor de
+    'a' na rota; o que decide se a troca compensa são as ligações de 'b' a esses dois
+    vizinhos. Por isso as listas são de sucessão, indexadas pelo ID do serviço (0 é o
+    depósito):
+        - depois[p]: os serviços cujo início fica mais perto do fim de 'p';
+        - antes[q]: os serviços cujo fim fica mais perto do início de 'q'.
+    Os candidatos ao lugar de 'a' são depois[pred(a)] | antes[succ(a)], e 'inv_depois'
+    e 'inv_antes' (as relações inversas) dão os lugares onde cada serviço cabe bem.
+    """
+    def __init__(self, depois, antes):
+        self.depois = depois
+        self.antes = antes
+        self.inv_depois = self._inverter(depois)
+        self.inv_antes = self._inverter(antes)
+
+    @staticmethod
+    def _inverter(listas):
+        inversa = {}
+        for sid, lista in listas.items():
+            for outro in lista:
+                inversa.setdefault(outro, set()).add(sid)
+        return inversa
+
+
+def calcular_vizinhos_granulares(grafo, servicos_info, dist_matrix, node_to_index, k=10):
+    """
+    Pré-calcula, para cada serviço e para o depósito, os 'k' serviços que melhor o
+    podem seguir e os 'k' que melhor o podem preceder (ver 'VizinhosGranulares').
+    Trocas que põem um serviço longe dos seus novos vizinhos de rota raramente
+    melhoram a solução, pelo que a busca granular avalia apenas as trocas em que um
+    dos serviços fica, no lugar do outro, perto de um dos seus novos vizinhos.
+
+    Args:
+        grafo (CustomGraph): O objeto do grafo.
+        servicos_info (dict | TabelaServicos): Informações detalhadas de cada serviço.
+        dist_matrix (list[list]): Matriz de caminhos mínimos pré-calculada.
+        node_to_index (dict): Mapeamento de ID de nó para índice de matriz.
+        k (int): Número de serviços guardados em cada lista.
+
+    Returns:
+        VizinhosGranulares: As listas de sucessão e as suas inversas.
+    """
+    if k < 1:
+        raise ValueError(f"O número de vizinhos tem de ser pelo menos 1 (recebido: {k}).")
+    tabela = TabelaServicos.de(servicos_info, node_to_index)
+    deposito = node_to_index[grafo.depot]
+    # Extremidades de cada serviço, na posição do seu ID; o depósito é o "serviço" 0.
+    sids = np.array([0] + [servico[0] for servico in tabela.servicos])
+    inicios = [deposito] + list(tabela.inicio)
+    fins = [deposito] + list(tabela.fim)
+
+    # ligacao[a, b] = dist(fim de a, início de b): a linha de 'a' ordena quem o pode
+    # seguir e a coluna de 'b' quem o pode preceder.
+    ligacao = np.asarray(dist_matrix, dtype=np.float64)[np.ix_(fins, inicios)]
+    k = max(1, min(k, len(sids) - 1))
+    listas = []
+    for custos in (ligacao, ligacao.T.copy()):
+        # Um serviço não é vizinho de si próprio e o depósito não é candidato.
+        np.fill_diagonal(custos, np.inf)
+        custos[:, 0] = np.inf
+        mais_proximos = np.argpartition(custos, k - 1, axis=1)[:, :k]
+        listas.append({int(sid): set(sids[linha].tolist()) for sid, linha in zip(sids, mais_proximos)})
+    return VizinhosGranulares(*listas)
+
+
+def _delta_troca(rota1, idx1, rota2, idx2, tabela, dist_matrix, deposito):
+    """
+    Avalia, em O(1), a troca do serviço 'idx1' de 'rota1' com o serviço 'idx2' de 'rota2'.
+    Retorna a variação de custo ou None se a troca violar a capacidade de algum veículo.
+    'deposito' é o índice de matriz do depósito.
+    """
+    servicos1 = rota1.servicos_realizados
+    servicos2 = rota2.servicos_realizados
+    s1 = servicos1[idx1][0] - 1
+    s2 = servicos2[idx2][0] - 1
+    demanda, custo, inicio, fim = tabela.demanda, tabela.custo, tabela.inicio, tabela.fim
+
+    # --- 1. Checagem de Viabilidade (Capacidade) ---
+    # Verifica se a troca respeita a capacidade máxima de ambos os veículos.
+    if (rota1.carga_total - demanda[s1] + demanda[s2] > rota1.capacidade_maxima) or \
+       (rota2.carga_total - demanda[s2] + demanda[s1] > rota2.capacidade_maxima):
+        return None
+
+    # --- 2. Cálculo do Delta Custo (Otimização O(1)) ---
+    # Identifica (em índices de matriz) os nós vizinhos de cada serviço na sua rota original.
+    no_ant1 = deposito if idx1 == 0 else fim[servicos1[idx1 - 1][0] - 1]
+    no_prox1 = deposito if idx1 == len(servicos1) - 1 else inicio[servicos1[idx1 + 1][0] - 1]
+
+    no_ant2 = deposito if idx2 == 0 else fim[servicos2[idx2 - 1][0] - 1]
+    no_prox2 = deposito if idx2 == len(servicos2) - 1 else inicio[servicos2[idx2 + 1][0] - 1]
+
+    # Custo da vizinhança do serviço 1 na rota 1 (a ser removido)
+    custo_antigo1 = (dist_matrix[no_ant1][inicio[s1]] + custo[s1] + dist_matrix[fim[s1]][no_prox1])
+    # Custo da vizinhança do serviço 2 na rota 2 (a ser removido)
+    custo_antigo2 = (dist_matrix[no_ant2][inicio[s2]] + custo[s2] + dist_matrix[fim[s2]][no_prox2])
+
+    # Custo de inserir o serviço 2 na rota 1
+    custo_novo1 = (dist_matrix[no_ant1][inicio[s2]] + custo[s2] + dist_matrix[fim[s2]][no_prox1])
+    # Custo de inserir o serviço 1 na rota 2
+    custo_novo2 = (dist_matrix[no_ant2][inicio[s1]] + custo[s1] + dist_matrix[fim[s1]][no_prox2])
+
+    # A variação total de custo é a diferença entre o custo novo e o antigo.
+    return (custo_novo1 + custo_novo2) - (custo_antigo1 + custo_antigo2)
+
+
+def swap_entre_rotas(solucao_obj, grafo, servicos_info, dist_matrix, node_to_index, vizinhos=None):
     """
     Aplica um algoritmo de busca local (Etapa 3) para otimizar uma solução inicial.
 
@@ -13,72 +126,72 @@ def swap_entre_rotas(solucao_obj, grafo, servicos_info, dist_matrix, node_to_ind
         - Best Improvement: A cada iteração, avalia todas as trocas possíveis e aplica
           apenas a que gera a maior redução de custo.
         - Iterativa: O processo repete-se até que nenhuma troca vantajosa seja encontrada.
+        - Granular (opcional): Com 'vizinhos', cada iteração avalia apenas as trocas que
+          põem um serviço perto de um dos seus novos vizinhos de rota (ver
+          'calcular_vizinhos_granulares'). Quando estas se esgotam, os pares de rotas
+          alterados desde a última varredura completa são reavaliados por completo, pelo
+          que a busca termina num ótimo local da vizinhança completa.
 
     Otimização de Performance:
         - Avaliação Delta: O custo de cada troca é calculado de forma incremental (O(1)),
           evitando o recálculo completo da rota, o que torna a busca eficiente.
+        - Memorização: A melhor troca de cada par de rotas fica guardada entre iterações.
+          Depois de aplicar uma troca, só os pares que envolvem as duas rotas alteradas
+          são reavaliados ("don't look bits": os serviços das restantes rotas não voltam
+          a ser examinados), o que reduz cada iteração após a primeira de O(R²·L²) para
+          O(R·L²). O resultado é o mesmo da busca sem memorização.
     
     Args:
         solucao_obj (Solucao): O objeto de solução inicial a ser otimizado.
         grafo (CustomGraph): O objeto do grafo.
-        servicos_info (dict): Dicionário com informações detalhadas de cada serviço.
+        servicos_info (dict | TabelaServicos): Informações detalhadas de cada serviço.
         dist_matrix (list[list]): Matriz de caminhos mínimos pré-calculada.
         node_to_index (dict): Mapeamento de ID de nó para índice de matriz.
+        vizinhos (VizinhosGranulares | None): Listas granulares da troca.
 
     Returns:
         Solucao: Um novo objeto de solução, otimizado pela busca local.
     """
-    # Cria uma cópia profunda inicial para não modificar a solução original.
-    solucao_atual = copy.deepcopy(solucao_obj)
+    # Cria uma cópia inicial (barata, ver "Solucao.copiar") para não modificar a solução original.
+    solucao_atual = solucao_obj.copiar()
+    rotas = solucao_atual.rotas
+    tabela = TabelaServicos.de(servicos_info, node_to_index)
+    deposito = node_to_index[grafo.depot]
+
+    # Melhor troca melhorativa de cada par de rotas (i < j): (delta, idx1, idx2).
+    # Pares sem troca melhorativa não são guardados.
+    melhores = {}
+    # Rotas cujos serviços precisam de ser reexaminados (inicialmente, todas).
+    rotas_alteradas = set(range(len(rotas)))
+
+    if vizinhos is not None:
+        # Posição (rota, índice) de cada serviço, para encontrar os vizinhos de rota.
+        posicao = {servico[0]: (i, idx) for i, rota in enumerate(rotas) for idx, servico in enumerate(rota.servicos_realizados)}
+        # Rotas alteradas desde a última varredura completa (inicialmente, todas).
+        por_verificar = set(range(len(rotas)))
 
     while True:
-        melhor_delta_custo = 0
-        melhor_troca_info = None
-
-        # Itera sobre todos os pares de rotas (r1, r2) para testar trocas.
-        for i in range(len(solucao_atual.rotas)):
-            for j in range(i + 1, len(solucao_atual.rotas)):
-                rota1 = solucao_atual.rotas[i]
-                rota2 = solucao_atual.rotas[j]
-
-                # Itera sobre todos os pares de serviços (s1 de r1, s2 de r2).
-                for idx1, (s1_id, u1, v1, t1) in enumerate(rota1.servicos_realizados):
-                    for idx2, (s2_id, u2, v2, t2) in enumerate(rota2.servicos_realizados):
-                        
-                        servico1_info = servicos_info[(u1, v1, t1)]
-                        servico2_info = servicos_info[(u2, v2, t2)]
-                        
-                        # --- 1. Checagem de Viabilidade (Capacidade) ---
-                        # Verifica se a troca respeita a capacidade máxima de ambos os veículos.
-                        if (rota1.carga_total - servico1_info['demand'] + servico2_info['demand'] > rota1.capacidade_maxima) or \
-                           (rota2.carga_total - servico2_info['demand'] + servico1_info['demand'] > rota2.capacidade_maxima):
-                            continue
-
-                        # --- 2. Cálculo do Delta Custo (Otimização O(1)) ---
-                        # Identifica os nós vizinhos de cada serviço na sua rota original.
-                        no_ant1 = rota1.id_deposito if idx1 == 0 else rota1.servicos_realizados[idx1 - 1][2]
-                        no_prox1 = rota1.id_deposito if idx1 == len(rota1.servicos_realizados) - 1 else rota1.servicos_realizados[idx1 + 1][1]
-                        
-                        no_ant2 = rota2.id_deposito if idx2 == 0 else rota2.servicos_realizados[idx2 - 1][2]
-                        no_prox2 = rota2.id_deposito if idx2 == len(rota2.servicos_realizados) - 1 else rota2.servicos_realizados[idx2 + 1][1]
-                        
-                        # Custo da vizinhança do serviço 1 na rota 1 (a ser removido)
-                        custo_antigo1 = (dist_matrix[node_to_index[no_ant1]][node_to_index[u1]] + servico1_info['cost'] + dist_matrix[node_to_index[v1]][node_to_index[no_prox1]])
-                        # Custo da vizinhança do serviço 2 na rota 2 (a ser removido)
-                        custo_antigo2 = (dist_matrix[node_to_index[no_ant2]][node_to_index[u2]] + servico2_info['cost'] + dist_matrix[node_to_index[v2]][node_to_index[no_prox2]])
-
-                        # Custo de inserir o serviço 2 na rota 1
-                        custo_novo1 = (dist_matrix[node_to_index[no_ant1]][node_to_index[u2]] + servico2_info['cost'] + dist_matrix[node_to_index[v2]][node_to_index[no_prox1]])
-                        # Custo de inserir o serviço 1 na rota 2
-                        custo_novo2 = (dist_matrix[node_to_index[no_ant2]][node_to_index[u1]] + servico1_info['cost'] + dist_matrix[node_to_index[v1]][node_to_index[no_prox2]])
-                        
-                        # A variação total de custo é a diferença entre o custo novo e o antigo.
-                        delta_local = (custo_novo1 + custo_novo2) - (custo_antigo1 + custo_antigo2)
-
-                        # Se a troca atual for a melhor encontrada até agora, guarda a sua informação.
-                        if delta_local < melhor_delta_custo:
-                            melhor_delta_custo = delta_local
-                            melhor_troca_info = (i, j, idx1, idx2)
+        # Descarta as trocas memorizadas que envolvem rotas alteradas e reavalia esses pares.
+        for par in [par for par in melhores if par[0] in rotas_alteradas or par[1] in rotas_alteradas]:
+            del melhores[par]
+        if vizinhos is None:
+            _avaliar_pares_completos(rotas, rotas_alteradas, melhores, tabela, dist_matrix, deposito)
+        else:
+            _avaliar_pares_granulares(rotas, rotas_alteradas, melhores, tabela, dist_matrix, deposito,
+                                      vizinhos, posicao)
+
+        melhor_delta_custo, melhor_troca_info = _melhor_troca_global(melhores)
+
+        # Quando a busca granular converge, as trocas que tiram um serviço muito mal
+        # colocado do seu lugar (longe de todos os vizinhos) podem ter ficado por
+        # avaliar: os pares com rotas alteradas desde a última varredura completa são
+        # reavaliados por completo e, se houver uma troca melhorativa, a busca continua.
+        if melhor_troca_info is None and vizinhos is not None and por_verificar:
+            for par in [par for par in melhores if par[0] in por_verificar or par[1] in por_verificar]:
+                del melhores[par]
+            _avaliar_pares_completos(rotas, por_verificar, melhores, tabela, dist_matrix, deposito)
+            por_verificar = set()
+            melhor_delta_custo, melhor_troca_info = _melhor_troca_global(melhores)
 
         # Após testar todas as trocas, verifica se uma melhoria foi encontrada.
         if melhor_troca_info:
@@ -86,18 +199,474 @@ def swap_entre_rotas(solucao_obj, grafo, servicos_info, dist_matrix, node_to_ind
             i, j, idx1, idx2 = melhor_troca_info
             
             # Realiza a troca dos serviços entre as listas das rotas.
-            servico_trocado1 = solucao_atual.rotas[i].servicos_realizados[idx1]
-            servico_trocado2 = solucao_atual.rotas[j].servicos_realizados[idx2]
-            solucao_atual.rotas[i].servicos_realizados[idx1] = servico_trocado2
-            solucao_atual.rotas[j].servicos_realizados[idx2] = servico_trocado1
+            servico_trocado1 = rotas[i].servicos_realizados[idx1]
+            servico_trocado2 = rotas[j].servicos_realizados[idx2]
+            rotas[i].servicos_realizados[idx1] = servico_trocado2
+            rotas[j].servicos_realizados[idx2] = servico_trocado1
+            if vizinhos is not None:
+                posicao[servico_trocado2[0]] = (i, idx1)
+                posicao[servico_trocado1[0]] = (j, idx2)
             
             # Recalcula o custo e a carga das duas rotas alteradas para manter a consistência.
-            solucao_atual.rotas[i].recalcular_rota_completa(grafo, servicos_info, dist_matrix, node_to_index)
-            solucao_atual.rotas[j].recalcular_rota_completa(grafo, servicos_info, dist_matrix, node_to_index)
+            rotas[i].recalcular_rota_completa(grafo, tabela, dist_matrix, node_to_index)
+            rotas[j].recalcular_rota_completa(grafo, tabela, dist_matrix, node_to_index)
+            rotas_alteradas = {i, j}
+            if vizinhos is not None:
+                por_verificar |= rotas_alteradas
+            if telemetria.ATIVA:
+                telemetria.registar_melhoria('swap', melhor_delta_custo)
         else:
             # Se nenhuma troca vantajosa foi encontrada numa iteração completa, a busca termina.
             break
             
     # Recalcula o custo total da solução antes de a retornar.
     solucao_atual.recalcular_custo_solucao()
-    return solucao_atual
\ No newline at end of file
+    return solucao_atual
+
+
+def _melhor_troca_global(melhores):
+    """
+    Retorna (delta, (i, j, idx1, idx2)) da melhor troca memorizada, ou (0, None). Em
+    caso de empate, ganha o par de menor índice, tal como na varredura completa.
+    """
+    melhor_delta_custo = 0
+    melhor_troca_info = None
+    for (i, j), (delta, idx1, idx2) in melhores.items():
+        if delta < melhor_delta_custo or (delta == melhor_delta_custo and melhor_troca_info and (i, j) < melhor_troca_info[:2]):
+            melhor_delta_custo = delta
+            melhor_troca_info = (i, j, idx1, idx2)
+    return melhor_delta_custo, melhor_troca_info
+
+
+def _melhor_troca_par(rota1, rota2, tabela, dist_matrix, deposito):
+    """ Avalia todas as trocas entre duas rotas e devolve (delta, idx1, idx2) da melhor. """
+    melhor = (0, None, None)
+    rejeitadas = 0
+
+    # Itera sobre todos os pares de serviços (s1 de r1, s2 de r2).
+    for idx1 in range(len(rota1.servicos_realizados)):
+        for idx2 in range(len(rota2.servicos_realizados)):
+            delta_local = _delta_troca(rota1, idx1, rota2, idx2, tabela, dist_matrix, deposito)
+
+            if delta_local is None:
+                rejeitadas += 1
+            # Se a troca atual for a melhor encontrada até agora, guarda a sua informação.
+            elif delta_local < melhor[0]:
+                melhor = (delta_local, idx1, idx2)
+
+    if telemetria.ATIVA:
+        telemetria.contar('swap.avaliados', len(rota1.servicos_realizados) * len(rota2.servicos_realizados))
+        telemetria.contar('swap.rejeitados_capacidade', rejeitadas)
+    return melhor
+
+
+def _avaliar_pares_completos(rotas, rotas_alteradas, melhores, tabela, dist_matrix, deposito):
+    """ Reavalia, por completo, todos os pares de rotas que envolvem uma rota alterada. """
+    for i in range(len(rotas)):
+        for j in range(i + 1, len(rotas)):
+            if i in rotas_alteradas or j in rotas_alteradas:
+                melhor = _melhor_troca_par(rotas[i], rotas[j], tabela, dist_matrix, deposito)
+                if melhor[1] is not None:
+                    melhores[(i, j)] = melhor
+
+
+def _candidatos_granulares(rotas, r, idx, vizinhos, posicao):
+    """
+    Serviços (IDs) a testar numa troca com o serviço na posição 'idx' da rota 'r': os
+    que cabem bem no lugar dele (perto do seu predecessor ou do seu sucessor) e os que
+    ocupam um lugar onde ele cabe bem.
+    """
+    servicos = rotas[r].servicos_realizados
+    sid = servicos[idx][0]
+    pred = servicos[idx - 1][0] if idx > 0 else 0
+    succ = servicos[idx + 1][0] if idx < len(servicos) - 1 else 0
+    candidatos = set(vizinhos.depois.get(pred, ())) | vizinhos.antes.get(succ, set())
+
+    # Serviços a seguir a um 'p' com o serviço em depois[p] (p = 0: os primeiros de cada rota).
+    for p in vizinhos.inv_depois.get(sid, ()):
+        if p == 0:
+            candidatos.update(rota.servicos_realizados[0][0] for rota in rotas if rota.servicos_realizados)
+        else:
+            rp, ip = posicao[p]
+            if ip + 1 < len(rotas[rp].servicos_realizados):
+                candidatos.add(rotas[rp].servicos_realizados[ip + 1][0])
+    # Serviços antes de um 'q' com o serviço em antes[q] (q = 0: os últimos de cada rota).
+    for q in vizinhos.inv_antes.get(sid, ()):
+        if q == 0:
+            candidatos.update(rota.servicos_realizados[-1][0] for rota in rotas if rota.servicos_realizados)
+        else:
+            rq, iq = posicao[q]
+            if iq > 0:
+                candidatos.add(rotas[rq].servicos_realizados[iq - 1][0])
+    return candidatos
+
+
+def _avaliar_pares_granulares(rotas, rotas_alteradas, melhores, tabela, dist_matrix, deposito,
+                              vizinhos, posicao):
+    """
+    Reavalia as trocas granulares dos serviços das rotas alteradas: cada serviço é
+    testado contra os candidatos de '_candidatos_granulares' que estão noutras rotas.
+    """
+    avaliadas = rejeitadas = 0
+    for a in rotas_alteradas:
+        for idx, (s1_id, _, _, _) in enumerate(rotas[a].servicos_realizados):
+            pos1 = (a, idx)
+            for s2_id in _candidatos_granulares(rotas, a, idx, vizinhos, posicao):
+                pos2 = posicao[s2_id]
+                if pos1[0] == pos2[0]:
+                    continue
+
+                # A troca é sempre descrita com a rota de menor índice primeiro.
+                (i, idx1), (j, idx2) = (pos1, pos2) if pos1[0] < pos2[0] else (pos2, pos1)
+                delta_local = _delta_troca(rotas[i], idx1, rotas[j], idx2, tabela, dist_matrix, deposito)
+                avaliadas += 1
+                if delta_local is None:
+                    rejeitadas += 1
+                elif delta_local < melhores.get((i, j), (0,))[0]:
+                    melhores[(i, j)] = (delta_local, idx1, idx2)
+
+    if telemetria.ATIVA:
+        telemetria.contar('swap.avaliados', avaliadas)
+        telemetria.contar('swap.rejeitados_capacidade', rejeitadas)
+
+
+# --- Descida em Vizinhança Variável (VND) ---
+
+# Tolerância usada para considerar um movimento como melhorativo.
+EPS_MELHORIA = 1e-9
+
+
+class ContextoBusca:
+    """
+    Agrupa os dados só de leitura usados pelas vizinhanças do VND e fornece, para cada
+    rota, a sua "vista" em índices de matriz: início, fim e demanda de cada serviço.
+    """
+    def __init__(self, grafo, servicos_info, dist_matrix, node_to_index):
+        self.grafo = grafo
+        self.tabela = TabelaServicos.de(servicos_info, node_to_index)
+        self.dist = dist_matrix
+        self.node_to_index = node_to_index
+        self.deposito = node_to_index[grafo.depot]
+
+    def vista(self, rota):
+        """ Retorna as listas (inicios, fins, demandas) dos serviços da rota. """
+        tabela = self.tabela
+        indices = [servico[0] - 1 for servico in rota.servicos_realizados]
+        inicios = [tabela.inicio[i] for i in indices]
+        fins = [tabela.fim[i] for i in indices]
+        demandas = [tabela.demanda[i] for i in indices]
+        return inicios, fins, demandas
+
+    def recalcular(self, solucao, *indices_rotas):
+        """ Recalcula as rotas alteradas por um movimento e remove as que ficaram vazias. """
+        for i in indices_rotas:
+            solucao.rotas[i].recalcular_rota_completa(self.grafo, self.tabela, self.dist, self.node_to_index)
+        solucao.rotas = [rota for rota in solucao.rotas if rota.servicos_realizados]
+        solucao.recalcular_custo_solucao()
+
+
+def _contar_movimentos(nome, avaliados, rejeitados=0):
+    """
+    Comunica à telemetria os movimentos avaliados por uma exploração da vizinhança
+    'nome' (incluindo os rejeitados) e os rejeitados pela capacidade.
+    """
+    if telemetria.ATIVA:
+        telemetria.contar(f'vnd.{nome}.avaliados', avaliados)
+        telemetria.contar(f'vnd.{nome}.rejeitados_capacidade', rejeitados)
+
+
+def _registar(melhor, delta, aplicar, primeira_melhoria):
+    """
+    Compara um movimento com o melhor encontrado até agora. Retorna o novo melhor e
+    se a busca na vizinhança deve parar (first improvement).
+    """
+    if delta < -EPS_MELHORIA and (melhor is None or delta < melhor[0]):
+        return (delta, aplicar), primeira_melhoria
+    return melhor, False
+
+
+def vizinhanca_realocacao(solucao, ctx, primeira_melhoria=False):
+    """
+    Realocação (relocate): move um serviço para qualquer posição de outra rota.
+    Delta O(1): ganho da remoção na rota de origem mais custo da inserção no destino.
+    """
+    D = ctx.dist
+    d = ctx.deposito
+    rotas = solucao.rotas
+    vistas = [ctx.vista(rota) for rota in rotas]
+    melhor = None
+    avaliados = rejeitados = 0
+
+    for a, rota_a in enumerate(rotas):
+        ini_a, fim_a, dem_a = vistas[a]
+        La = len(ini_a)
+        for p in range(La):
+            ant = fim_a[p - 1] if p > 0 else d
+            prox = ini_a[p + 1] if p < La - 1 else d
+            ganho_remocao = D[ant][ini_a[p]] + D[fim_a[p]][prox] - D[ant][prox]
+
+            for b, rota_b in enumerate(rotas):
+                if b == a:
+                    continue
+                ini_b, fim_b, _ = vistas[b]
+                Lb = len(ini_b)
+                avaliados += Lb + 1
+                if rota_b.carga_total + dem_a[p] > rota_b.capacidade_maxima:
+                    # Todas as posições de inserção nesta rota ficam excluídas.
+                    rejeitados += Lb + 1
+                    continue
+                for q in range(Lb + 1):
+                    x = fim_b[q - 1] if q > 0 else d
+                    y = ini_b[q] if q < Lb else d
+                    delta = D[x][ini_a[p]] + D[fim_a[p]][y] - D[x][y] - ganho_remocao
+                    if delta < -EPS_MELHORIA and (melhor is None or delta < melhor[0]):
+                        def aplicar(a=a, b=b, p=p, q=q):
+                            rotas[b].servicos_realizados.insert(q, rotas[a].servicos_realizados.pop(p))
+                            ctx.recalcular(solucao, a, b)
+                        melhor, parar = _registar(melhor, delta, aplicar, primeira_melhoria)
+                        if parar:
+                            _contar_movimentos('vizinhanca_realocacao', avaliados - (Lb - q), rejeitados)
+                            return melhor
+    _contar_movimentos('vizinhanca_realocacao', avaliados, rejeitados)
+    return melhor
+
+
+def vizinhanca_troca(solucao, ctx, primeira_melhoria=False):
+    """ Troca (swap) de um serviço entre duas rotas, com o mesmo delta O(1) de 'swap_entre_rotas'. """
+    rotas = solucao.rotas
+    melhor = None
+    avaliados = rejeitados = 0
+    for i in range(len(rotas)):
+        for j in range(i + 1, len(rotas)):
+            Lj = len(rotas[j].servicos_realizados)
+            for idx1 in range(len(rotas[i].servicos_realizados)):
+                avaliados += Lj
+                for idx2 in range(Lj):
+                    delta = _delta_troca(rotas[i], idx1, rotas[j], idx2, ctx.tabela, ctx.dist, ctx.deposito)
+                    if delta is None:
+                        rejeitados += 1
+                    elif delta < -EPS_MELHORIA and (melhor is None or delta < melhor[0]):
+                        def aplicar(i=i, j=j, idx1=idx1, idx2=idx2):
+                            s1 = rotas[i].servicos_realizados
+                            s2 = rotas[j].servicos_realizados
+                            s1[idx1], s2[idx2] = s2[idx2], s1[idx1]
+                            ctx.recalcular(solucao, i, j)
+                        melhor, parar = _registar(melhor, delta, aplicar, primeira_melhoria)
+                        if parar:
+                            _contar_movimentos('vizinhanca_troca', avaliados - (Lj - 1 - idx2), rejeitados)
+                            return melhor
+    _contar_movimentos('vizinhanca_troca', avaliados, rejeitados)
+    return melhor
+
+
+def vizinhanca_2opt(solucao, ctx, primeira_melhoria=False):
+    """
+    2-opt intra-rota: inverte a ordem de visita de um trecho de serviços (cada serviço
+    mantém o seu sentido). Como a matriz é assimétrica, as ligações internas do trecho
+    mudam; o delta é O(1) graças a somas de prefixo das ligações no sentido original
+    (F) e no sentido invertido (B), calculadas uma vez por rota.
+    """
+    D = ctx.dist
+    d = ctx.deposito
+    melhor = None
+    avaliados = 0
+
+    for r, rota in enumerate(solucao.rotas):
+        ini, fim, _ = ctx.vista(rota)
+        L = len(ini)
+        F = [0] * L
+        B = [0] * L
+        for k in range(L - 1):
+            F[k + 1] = F[k] + D[fim[k]][ini[k + 1]]
+            B[k + 1] = B[k] + D[fim[k + 1]][ini[k]]
+
+        for a in range(L - 1):
+            ant = fim[a - 1] if a > 0 else d
+            avaliados += L - 1 - a
+            for b in range(a + 1, L):
+                prox = ini[b + 1] if b < L - 1 else d
+                antigo = D[ant][ini[a]] + (F[b] - F[a]) + D[fim[b]][prox]
+                novo = D[ant][ini[b]] + (B[b] - B[a]) + D[fim[a]][prox]
+                delta = novo - antigo
+                if delta < -EPS_MELHORIA and (melhor is None or delta < melhor[0]):
+                    def aplicar(r=r, a=a, b=b):
+                        servicos = solucao.rotas[r].servicos_realizados
+                        servicos[a:b + 1] = servicos[a:b + 1][::-1]
+                        ctx.recalcular(solucao, r)
+                    melhor, parar = _registar(melhor, delta, aplicar, primeira_melhoria)
+                    if parar:
+                        _contar_movimentos('vizinhanca_2opt', avaliados - (L - 1 - b))
+                        return melhor
+    _contar_movimentos('vizinhanca_2opt', avaliados)
+    return melhor
+
+
+def vizinhanca_or_opt(solucao, ctx, primeira_melhoria=False, tamanho_maximo=3):
+    """
+    Or-opt intra-rota: move um trecho de 1 a 'tamanho_maximo' serviços consecutivos
+    para outra posição da mesma rota, mantendo a sua ordem. Delta O(1).
+    """
+    D = ctx.dist
+    d = ctx.deposito
+    melhor = None
+    avaliados = 0
+
+    for r, rota in enumerate(solucao.rotas):
+        ini, fim, _ = ctx.vista(rota)
+        L = len(ini)
+        for tamanho in range(1, tamanho_maximo + 1):
+            for a in range(L - tamanho + 1):
+                e = a + tamanho - 1
+                ant = fim[a - 1] if a > 0 else d
+                prox = ini[e + 1] if e < L - 1 else d
+                ganho_remocao = D[ant][ini[a]] + D[fim[e]][prox] - D[ant][prox]
+
+                # 'q' é a posição (na rota original) antes da qual o trecho é inserido;
+                # as posições de 'a' a 'e + 1' deixariam a rota igual.
+                avaliados += L - tamanho
+                for q in range(L + 1):
+                    if a <= q <= e + 1:
+                        continue
+                    x = fim[q - 1] if q > 0 else d
+                    y = ini[q] if q < L else d
+                    delta = D[x][ini[a]] + D[fim[e]][y] - D[x][y] - ganho_remocao
+                    if delta < -EPS_MELHORIA and (melhor is None or delta < melhor[0]):
+                        def aplicar(r=r, a=a, e=e, q=q):
+                            s = solucao.rotas[r].servicos_realizados
+                            trecho = s[a:e + 1]
+                            if q < a:
+                                s[:] = s[:q] + trecho + s[q:a] + s[e + 1:]
+                            else:
+                                s[:] = s[:a] + s[e + 1:q] + trecho + s[q:]
+                            ctx.recalcular(solucao, r)
+                        melhor, parar = _registar(melhor, delta, aplicar, primeira_melhoria)
+                        if parar:
+                            restantes = sum(1 for x in range(q + 1, L + 1) if not a <= x <= e + 1)
+                            _contar_movimentos('vizinhanca_or_opt', avaliados - restantes)
+                            return melhor
+    _contar_movimentos('vizinhanca_or_opt', avaliados)
+    return melhor
+
+
+def vizinhanca_cross_exchange(solucao, ctx, primeira_melhoria=False, tamanho_maximo=3):
+    """
+    Cross-exchange: troca um trecho de 1 a 'tamanho_maximo' serviços de uma rota com um
+    trecho de outra rota. Os trechos mantêm a ordem interna, pelo que só as quatro
+    ligações das extremidades mudam (delta O(1)); a capacidade é verificada com somas
+    de prefixo das demandas.
+    """
+    D = ctx.dist
+    d = ctx.deposito
+    rotas = solucao.rotas
+    vistas = [ctx.vista(rota) for rota in rotas]
+    prefixos = []
+    for _, _, dem in vistas:
+        acumulado = [0]
+        for valor in dem:
+            acumulado.append(acumulado[-1] + valor)
+        prefixos.append(acumulado)
+    melhor = None
+    avaliados = rejeitados = 0
+
+    for i in range(len(rotas)):
+        ini_i, fim_i, _ = vistas[i]
+        Li = len(ini_i)
+        for j in range(i + 1, len(rotas)):
+            ini_j, fim_j, _ = vistas[j]
+            Lj = len(ini_j)
+            for la in range(1, min(tamanho_maximo, Li) + 1):
+                for a in range(Li - la + 1):
+                    ea = a + la - 1
+                    ant_a = fim_i[a - 1] if a > 0 else d
+                    prox_a = ini_i[ea + 1] if ea < Li - 1 else d
+                    dem_a = prefixos[i][ea + 1] - prefixos[i][a]
+                    antigo_a = D[ant_a][ini_i[a]] + D[fim_i[ea]][prox_a]
+                    for lb in range(1, min(tamanho_maximo, Lj) + 1):
+                        if la == 1 and lb == 1:
+                            continue  # já coberto pela vizinhança de troca simples
+                        avaliados += Lj - lb + 1
+                        for b in range(Lj - lb + 1):
+                            eb = b + lb - 1
+                            dem_b = prefixos[j][eb + 1] - prefixos[j][b]
+                            if (rotas[i].carga_total - dem_a + dem_b > rotas[i].capacidade_maxima or
+                                    rotas[j].carga_total - dem_b + dem_a > rotas[j].capacidade_maxima):
+                                rejeitados += 1
+                                continue
+                            ant_b = fim_j[b - 1] if b > 0 else d
+                            prox_b = ini_j[eb + 1] if eb < Lj - 1 else d
+                            delta = (D[ant_a][ini_j[b]] + D[fim_j[eb]][prox_a]
+                                     + D[ant_b][ini_i[a]] + D[fim_i[ea]][prox_b]
+                                     - antigo_a - D[ant_b][ini_j[b]] - D[fim_j[eb]][prox_b])
+                            if delta < -EPS_MELHORIA and (melhor is None or delta < melhor[0]):
+                                def aplicar(i=i, j=j, a=a, ea=ea, b=b, eb=eb):
+                                    si = rotas[i].servicos_realizados
+                                    sj = rotas[j].servicos_realizados
+                                    si[a:ea + 1], sj[b:eb + 1] = sj[b:eb + 1], si[a:ea + 1]
+                                    ctx.recalcular(solucao, i, j)
+                                melhor, parar = _registar(melhor, delta, aplicar, primeira_melhoria)
+                                if parar:
+                                    _contar_movimentos('vizinhanca_cross_exchange', avaliados - (Lj - lb - b),
+                                                       rejeitados)
+                                    return melhor
+    _contar_movimentos('vizinhanca_cross_exchange', avaliados, rejeitados)
+    return melhor
+
+
+# Vizinhanças disponíveis, pelo nome aceite em 'vnd' e na linha de comando.
+VIZINHANCAS = {
+    'realocacao': vizinhanca_realocacao,
+    'troca': vizinhanca_troca,
+    '2opt': vizinhanca_2opt,
+    'oropt': vizinhanca_or_opt,
+    'cross': vizinhanca_cross_exchange,
+}
+ORDEM_PADRAO_VND = ('realocacao', 'troca', '2opt', 'oropt', 'cross')
+
+
+def vnd(solucao_obj, grafo, servicos_info, dist_matrix, node_to_index, vizinhancas=ORDEM_PADRAO_VND, politica='melhor'):
+    """
+    Descida em Vizinhança Variável (VND) sobre várias vizinhanças.
+
+    As vizinhanças são exploradas pela ordem dada: sempre que uma encontra um
+    movimento melhorativo, ele é aplicado e a busca volta à primeira vizinhança; quando
+    nenhuma melhora a solução, ela é um ótimo local para todas e a busca termina.
+
+    Args:
+        solucao_obj (Solucao): O objeto de solução inicial a ser otimizado.
+        grafo (CustomGraph): O objeto do grafo.
+        servicos_info (dict | TabelaServicos): Informações detalhadas de cada serviço.
+        dist_matrix (list[list]): Matriz de caminhos mínimos pré-calculada.
+        node_to_index (dict): Mapeamento de ID de nó para índice de matriz.
+        vizinhancas (sequence): Ordem das vizinhanças. Cada item é um nome de
+            'VIZINHANCAS' ou uma função 'f(solucao, ctx, primeira_melhoria)' que devolve
+            None ou um par (delta, aplicar).
+        politica (str): 'melhor' (best improvement) ou 'primeira' (first improvement).
+
+    Returns:
+        Solucao: Um novo objeto de solução, otimizado pelo VND.
+    """
+    if politica not in ('melhor', 'primeira'):
+        raise ValueError(f"Política desconhecida: {politica!r} (use 'melhor' ou 'primeira').")
+    funcoes = [VIZINHANCAS[v] if isinstance(v, str) else v for v in vizinhancas]
+    primeira_melhoria = politica == 'primeira'
+
+    solucao_atual = solucao_obj.copiar()
+    ctx = ContextoBusca(grafo, servicos_info, dist_matrix, node_to_index)
+
+    k = 0
+    while k < len(funcoes):
+        movimento = funcoes[k](solucao_atual, ctx, primeira_melhoria)
+        if telemetria.ATIVA:
+            nome = getattr(funcoes[k], '__name__', str(k))
+            telemetria.contar(f'vnd.{nome}.exploracoes')
+            if movimento is not None:
+                telemetria.registar_melhoria(nome, movimento[0])
+        if movimento is not None:
+            _, aplicar = movimento
+            aplicar()
+            k = 0
+        else:
+            k += 1
+
+    solucao_atual.recalcular_custo_solucao()
+    return solucao_atual
@@ -1,9 +1,19 @@
 # Imports necessários
 import copy
+import io
+import re
+import sys
 import time
+import heapq
+from array import array
+from collections import deque
+
+import numpy as np
 
 class Rota:
     """ Representa uma única rota de um veículo. """
+    __slots__ = ('id_deposito', 'capacidade_maxima', 'servicos_realizados', 'carga_total', 'custo_total')
+
     def __init__(self, deposito_id, capacidade_max):
         self.id_deposito = deposito_id
         self.capacidade_maxima = capacidade_max
@@ -14,7 +24,14 @@ class Rota:
         self.custo_total = 0
 
     def recalcular_rota_completa(self, grafo, servicos_info, dist_matrix, node_to_index):
-        """ Recalcula o custo total da rota do zero. Útil após modificações complexas. """
+        """
+        Recalcula o custo total da rota do zero. Útil após modificações complexas.
+        'servicos_info' pode ser o dicionário de 'preparar_servicos' ou uma 'TabelaServicos'.
+        """
+        if isinstance(servicos_info, TabelaServicos):
+            self._recalcular_com_tabela(servicos_info, dist_matrix, node_to_index[self.id_deposito])
+            return
+
         self.custo_total = 0
         no_atual = self.id_deposito
         
@@ -32,6 +49,34 @@ class Rota:
         # Recalcula a carga
         self.carga_total = sum(servicos_info[(u,v,tipo)]['demand'] for (sid, u, v, tipo) in self.servicos_realizados)
 
+    def _recalcular_com_tabela(self, tabela, dist_matrix, deposito):
+        """ Versão de 'recalcular_rota_completa' que só indexa listas de inteiros. """
+        inicio, fim, demanda, custo = tabela.inicio, tabela.fim, tabela.demanda, tabela.custo
+        custo_total = 0
+        carga_total = 0
+        anterior = deposito
+        for servico in self.servicos_realizados:
+            i = servico[0] - 1
+            custo_total += dist_matrix[anterior][inicio[i]]
+            custo_total += custo[i]
+            carga_total += demanda[i]
+            anterior = fim[i]
+        self.custo_total = custo_total + dist_matrix[anterior][deposito]
+        self.carga_total = carga_total
+
+    def copiar(self):
+        """
+        Cópia barata da rota: as tuplas de serviço são imutáveis e por isso partilhadas,
+        bastando copiar a lista (e não percorrer o grafo de objetos como o 'deepcopy').
+        """
+        nova = Rota.__new__(Rota)
+        nova.id_deposito = self.id_deposito
+        nova.capacidade_maxima = self.capacidade_maxima
+        nova.servicos_realizados = self.servicos_realizados[:]
+        nova.carga_total = self.carga_total
+        nova.custo_total = self.custo_total
+        return nova
+
     def get_sequencia_nos_servico(self):
         """ Retorna a sequência de nós visitados, incluindo o depósito no início e fim. """
         sequencia = [self.id_deposito]
@@ -48,10 +93,15 @@ class Rota:
 
 class Solucao:
     """ Representa a solução completa, com um conjunto de rotas. """
+    __slots__ = ('rotas', 'custo_total', 'servicos_nao_atendidos', 'tempo_melhor_sol')
+
     def __init__(self):
         self.rotas = []
         self.custo_total = 0
         self.servicos_nao_atendidos = set()
+        # Instante (em microssegundos desde o início da execução) em que esta solução foi
+        # encontrada; preenchido pelas metaheurísticas e usado por 'formatar'.
+        self.tempo_melhor_sol = None
 
     def recalcular_custo_solucao(self):
         """ Soma o custo de todas as rotas para obter o custo total da solução. """
@@ -61,32 +111,288 @@ class Solucao:
         self.rotas.append(rota)
         self.recalcular_custo_solucao()
 
-    def print_formatado(self, nome_instancia, tempo_total, tempo_melhor_sol):
-        """ Imprime a solução no formato DAT exigido pelo professor. """
-        print(f"{int(self.custo_total)}")
-        print(f"{len(self.rotas)}")
-        print(f"{int(tempo_total)}")
-        print(f"{int(tempo_melhor_sol)}")
+    def copiar(self):
+        """ Cópia independente da solução, rota a rota (ver 'Rota.copiar'). """
+        nova = Solucao.__new__(Solucao)
+        nova.rotas = [rota.copiar() for rota in self.rotas]
+        nova.custo_total = self.custo_total
+        nova.servicos_nao_atendidos = set(self.servicos_nao_atendidos)
+        nova.tempo_melhor_sol = self.tempo_melhor_sol
+        return nova
+
+    def compactar(self):
+        """ Retorna um instantâneo compacto da solução (ver 'SolucaoCompacta'). """
+        return SolucaoCompacta.de_solucao(self)
+
+    def formatar(self, tempo_total, tempo_melhor_sol=None):
+        """
+        Retorna a solução no formato DAT exigido pelo professor, como uma única string
+        terminada em nova linha. Sem 'tempo_melhor_sol', usa o instante registado em
+        'self.tempo_melhor_sol' (ou, na falta dele, o tempo total).
+        """
+        if tempo_melhor_sol is None:
+            tempo_melhor_sol = self.tempo_melhor_sol if self.tempo_melhor_sol is not None else tempo_total
+        linhas = [str(int(self.custo_total)), str(len(self.rotas)), str(int(tempo_total)), str(int(tempo_melhor_sol))]
 
         for i, rota in enumerate(self.rotas, 1):
             # Formato da linha: 0 1 ID_ROTA DEMANDA CUSTO VISITAS (sequencia...)
             # Vamos usar a carga total e o número de serviços + 2 (depósito).
-            num_visitas = len(rota.servicos_realizados) + 2
-            
-            linha = f"0 1 {i} {int(rota.carga_total)} {int(rota.custo_total)} {num_visitas}"
-            
-            # Formato da tupla (Tipo ID, Nó1, Nó2)
-            # Depósito no início
-            linha += f" (D 0,1,1)"
+            # Cada visita é uma tupla (Tipo ID, Nó1, Nó2), com o depósito no início e no fim.
+            partes = [f"0 1 {i} {int(rota.carga_total)} {int(rota.custo_total)} {len(rota.servicos_realizados) + 2} (D 0,1,1)"]
+            partes.extend([f"(S {sid},{u},{v})" for (sid, u, v, tipo) in rota.servicos_realizados])
+            partes.append("(D 0,1,1)")
+            linhas.append(' '.join(partes))
 
-            # Serviços
-            for (sid, u, v, tipo) in rota.servicos_realizados:
-                linha += f" (S {sid},{u},{v})"
+        linhas.append('')
+        return '\n'.join(linhas)
 
-            # Depósito no fim
-            linha += f" (D 0,1,1)"
-            
-            print(linha)
+    def escrever(self, ficheiro, tempo_total, tempo_melhor_sol=None):
+        """
+        Escreve a solução (ver 'formatar') num objeto de ficheiro, de texto ou binário
+        (por exemplo 'open(..., "wb")' ou 'io.BytesIO'), com uma única chamada 'write'.
+        O ficheiro não é fechado nem esvaziado, pelo que várias soluções podem ser
+        escritas através do mesmo objeto; a saída padrão não é usada.
+        """
+        texto = self.formatar(tempo_total, tempo_melhor_sol)
+        if isinstance(ficheiro, (io.RawIOBase, io.BufferedIOBase)):
+            ficheiro.write(texto.encode('ascii'))
+        else:
+            ficheiro.write(texto)
+
+    def print_formatado(self, nome_instancia, tempo_total, tempo_melhor_sol=None):
+        """ Imprime a solução no formato DAT na saída padrão (ver 'formatar'). """
+        self.escrever(sys.stdout, tempo_total, tempo_melhor_sol)
+
+
+class SolucaoCompacta:
+    """
+    Representação compacta de uma solução, para guardar instantâneos dentro de
+    metaheurísticas (melhor solução, solução corrente, pontos de reinício).
+
+    Todas as rotas ficam num único buffer 'array' de IDs de serviço, delimitadas pelos
+    deslocamentos em 'inicios' (a rota r ocupa sids[inicios[r]:inicios[r + 1]]), com a
+    carga e o custo de cada rota guardados em buffers paralelos. Copiar a solução é
+    apenas copiar quatro buffers contíguos (um memcpy), sem criar objetos por serviço.
+    """
+    __slots__ = ('sids', 'inicios', 'cargas', 'custos', 'custo_total')
+
+    def __init__(self, sids, inicios, cargas, custos, custo_total):
+        self.sids = sids
+        self.inicios = inicios
+        self.cargas = cargas
+        self.custos = custos
+        self.custo_total = custo_total
+
+    @classmethod
+    def de_solucao(cls, solucao):
+        sids = array('i')
+        inicios = array('i', [0])
+        for rota in solucao.rotas:
+            sids.extend(servico[0] for servico in rota.servicos_realizados)
+            inicios.append(len(sids))
+        cargas = array('d', (rota.carga_total for rota in solucao.rotas))
+        custos = array('d', (rota.custo_total for rota in solucao.rotas))
+        return cls(sids, inicios, cargas, custos, solucao.custo_total)
+
+    @property
+    def num_rotas(self):
+        return len(self.inicios) - 1
+
+    def rota(self, r):
+        """ Retorna os IDs de serviço da rota r (uma cópia em 'array'). """
+        return self.sids[self.inicios[r]:self.inicios[r + 1]]
+
+    def copiar(self):
+        return SolucaoCompacta(self.sids[:], self.inicios[:], self.cargas[:], self.custos[:], self.custo_total)
+
+    def para_solucao(self, servicos_por_id, deposito_id, capacidade_max):
+        """
+        Reconstrói uma 'Solucao' a partir do instantâneo.
+
+        Args:
+            servicos_por_id (list): Tuplas (sid, u, v, tipo) indexadas pelo sid, com a
+                posição 0 vazia (por exemplo, '[None] + tabela.servicos').
+            deposito_id (int): Nó do depósito.
+            capacidade_max (int): Capacidade dos veículos.
+        """
+        solucao = Solucao()
+        for r in range(self.num_rotas):
+            rota = Rota(deposito_id, capacidade_max)
+            rota.servicos_realizados = [servicos_por_id[sid] for sid in self.sids[self.inicios[r]:self.inicios[r + 1]]]
+            rota.carga_total = self.cargas[r]
+            rota.custo_total = self.custos[r]
+            solucao.rotas.append(rota)
+        solucao.custo_total = self.custo_total
+        return solucao
+
+
+# Visita de uma linha de rota no formato DAT: '(S id,u,v)' ou '(D 0,1,1)'.
+_PADRAO_VISITA = re.compile(r'\((\w)\s*(-?\d+)\s*,\s*(-?\d+)\s*,\s*(-?\d+)\)')
+
+
+def ler_ficheiro_solucao(caminho):
+    """
+    Lê um ficheiro de solução no formato DAT escrito por 'Solucao.escrever'
+    (cabeçalho de 4 linhas seguido de uma linha por rota), sem o interpretar contra a
+    instância.
+
+    Returns:
+        dict: {'custo', 'num_rotas', 'clocks', 'clocks_melhor_sol', 'rotas'}, em que
+        'rotas' é uma lista de dicionários {'indice', 'carga', 'custo', 'visitas',
+        'servicos'}, com os campos declarados na linha e 'servicos' como lista de
+        tuplas (sid, u, v) pela ordem da rota.
+
+    Raises:
+        ValueError: Se o cabeçalho ou alguma linha de rota estiver mal-formada.
+    """
+    with open(caminho, 'r') as f:
+        linhas = [linha.strip() for linha in f if linha.strip()]
+    if len(linhas) < 4:
+        raise ValueError(f"{caminho}: cabeçalho incompleto ({len(linhas)} linhas).")
+
+    try:
+        solucao = {
+            'custo': float(linhas[0]),
+            'num_rotas': int(linhas[1]),
+            'clocks': int(linhas[2]),
+            'clocks_melhor_sol': int(linhas[3]),
+            'rotas': [],
+        }
+    except ValueError:
+        raise ValueError(f"{caminho}: cabeçalho inválido.") from None
+
+    for numero, linha in enumerate(linhas[4:], 5):
+        campos = linha.split(None, 6)
+        try:
+            indice, carga, custo, visitas = int(campos[2]), float(campos[3]), float(campos[4]), int(campos[5])
+        except (IndexError, ValueError):
+            raise ValueError(f"{caminho}:{numero}: linha de rota inválida.") from None
+        servicos = [(int(sid), int(u), int(v)) for tipo, sid, u, v in _PADRAO_VISITA.findall(linha) if tipo == 'S']
+        solucao['rotas'].append({'indice': indice, 'carga': carga, 'custo': custo, 'visitas': visitas,
+                                 'servicos': servicos})
+    return solucao
+
+
+def carregar_solucao(caminho, servicos_info, dist_matrix, node_to_index, deposito_id, capacidade_max):
+    """
+    Reconstrói uma 'Solucao' a partir de um ficheiro 'sol-*.dat' (ver
+    'ler_ficheiro_solucao'), para continuar a otimização a partir dela (warm start).
+
+    Os serviços são identificados pelo ID e convertidos nas tuplas (sid, u, v, tipo)
+    da instância. Como as rotas do pipeline percorrem cada aresta requerida no sentido
+    (u, v) em que está registada, uma aresta escrita no sentido inverso é normalizada
+    (e o custo pode subir). As cargas e os custos são recalculados com a matriz de
+    distâncias (os valores declarados no ficheiro são ignorados) e as rotas vazias
+    são descartadas.
+
+    Raises:
+        ValueError: Se o ficheiro estiver mal-formado ou não corresponder à instância
+            (IDs inexistentes, serviços em falta ou repetidos, capacidade excedida).
+    """
+    tabela = TabelaServicos.de(servicos_info, node_to_index)
+    dados = ler_ficheiro_solucao(caminho)
+
+    atendidos = [False] * len(tabela)
+    solucao = Solucao()
+    for linha in dados['rotas']:
+        rota = Rota(deposito_id, capacidade_max)
+        for sid, _, _ in linha['servicos']:
+            if not 1 <= sid <= len(tabela):
+                raise ValueError(f"{caminho}: serviço {sid} não existe na instância.")
+            if atendidos[sid - 1]:
+                raise ValueError(f"{caminho}: serviço {sid} atendido mais de uma vez.")
+            atendidos[sid - 1] = True
+            rota.servicos_realizados.append(tabela.servicos[sid - 1])
+        if not rota.servicos_realizados:
+            continue
+        rota.recalcular_rota_completa(None, tabela, dist_matrix, node_to_index)
+        if rota.carga_total > capacidade_max:
+            raise ValueError(f"{caminho}: a rota {linha['indice']} excede a capacidade.")
+        solucao.rotas.append(rota)
+
+    if not all(atendidos):
+        raise ValueError(f"{caminho}: {atendidos.count(False)} serviços da instância não são atendidos.")
+    solucao.recalcular_custo_solucao()
+    return solucao
+
+
+class TabelaServicos:
+    """
+    Tabela densa de serviços, alternativa ao dicionário de 'preparar_servicos'.
+
+    Cada serviço tem um índice i em 0..S-1 (o seu ID é i + 1) e os seus dados ficam em
+    listas paralelas, com as extremidades já convertidas em índices da matriz de
+    distâncias. Os laços internos do construtivo e da busca local passam assim a
+    indexar listas de inteiros, em vez de calcular hashes de tuplas (u, v, tipo),
+    consultar dicionários aninhados e traduzir nós com 'node_to_index'.
+
+    Atributos (listas indexadas por i):
+        servicos: tupla (sid, u, v, tipo), no formato de 'Rota.servicos_realizados'.
+        u, v, tipo: extremidades (IDs de nó) e tipo ('N', 'E' ou 'A').
+        inicio, fim: índices de matriz de 'u' e de 'v'.
+        demanda, custo: demanda e custo de serviço.
+    """
+    __slots__ = ('servicos', 'u', 'v', 'tipo', 'inicio', 'fim', 'demanda', 'custo', 'indice')
+
+    def __init__(self, servicos_info, node_to_index):
+        ordenados = sorted(servicos_info.items(), key=lambda item: item[1]['id'])
+        if [info['id'] for _, info in ordenados] != list(range(1, len(ordenados) + 1)):
+            raise ValueError("Os IDs dos serviços devem ser consecutivos, de 1 a S.")
+
+        self.servicos = [(info['id'], u, v, tipo) for (u, v, tipo), info in ordenados]
+        self.u = [u for (u, _, _), _ in ordenados]
+        self.v = [v for (_, v, _), _ in ordenados]
+        self.tipo = [tipo for (_, _, tipo), _ in ordenados]
+        self.inicio = [node_to_index[u] for u in self.u]
+        self.fim = [node_to_index[v] for v in self.v]
+        self.demanda = [info['demand'] for _, info in ordenados]
+        self.custo = [info['cost'] for _, info in ordenados]
+        # Chave (u, v, tipo) -> índice, para converter dados no formato antigo.
+        self.indice = {chave: i for i, (chave, _) in enumerate(ordenados)}
+
+    @classmethod
+    def de(cls, servicos_info, node_to_index):
+        """ Retorna 'servicos_info' se já for uma tabela; caso contrário, constrói-a. """
+        if isinstance(servicos_info, cls):
+            return servicos_info
+        return cls(servicos_info, node_to_index)
+
+    def __len__(self):
+        return len(self.servicos)
+
+
+def reprecificar_rotas(solucoes, servicos_info, dist_matrix, node_to_index, linhas_alteradas=None):
+    """
+    Recalcula em bloco a carga e o custo das rotas de várias soluções depois de a
+    matriz de distâncias ter mudado (por exemplo, com 'CustomGraph.alterar_custo').
+
+    Com 'linhas_alteradas' (o conjunto devolvido pelas alterações do grafo), só são
+    recalculadas as rotas com algum deslocamento a partir de uma dessas linhas; as
+    restantes mantêm o custo, que não pode ter mudado.
+
+    Args:
+        solucoes (iterable): Objetos 'Solucao' (cujo custo total também é atualizado)
+            ou 'Rota'.
+
+    Returns:
+        int: O número de rotas recalculadas.
+    """
+    tabela = TabelaServicos.de(servicos_info, node_to_index)
+    inicio, fim = tabela.inicio, tabela.fim
+    recalculadas = 0
+    for objeto in solucoes:
+        rotas = objeto.rotas if isinstance(objeto, Solucao) else [objeto]
+        for rota in rotas:
+            deposito = node_to_index[rota.id_deposito]
+            if linhas_alteradas is not None:
+                origens = [deposito] + [fim[servico[0] - 1] for servico in rota.servicos_realizados]
+                if linhas_alteradas.isdisjoint(origens):
+                    continue
+            rota._recalcular_com_tabela(tabela, dist_matrix, deposito)
+            recalculadas += 1
+        if isinstance(objeto, Solucao):
+            objeto.recalcular_custo_solucao()
+    return recalculadas
 
 
 def preparar_servicos(parsed_data):
@@ -116,50 +422,240 @@ def preparar_servicos(parsed_data):
     return servicos_info
 
 
-def construtivo_guloso_vizinho_mais_proximo(grafo, servicos_info, dist_matrix, node_to_index):
+def construtivo_guloso_vizinho_mais_proximo(grafo, servicos_info, dist_matrix, node_to_index, vetorizado=False):
     """
     Algoritmo construtivo simples (vizinho mais próximo).
     Cria rotas adicionando o serviço mais próximo que ainda não foi atendido.
+    'servicos_info' pode ser o dicionário de 'preparar_servicos' ou uma 'TabelaServicos';
+    em caso de empate, é escolhido o serviço de menor ID.
+
+    Com 'vetorizado=True', a escolha de cada serviço é feita em NumPy (ver
+    '_construtivo_vetorizado'), produzindo exatamente as mesmas rotas.
     """
+    tabela = TabelaServicos.de(servicos_info, node_to_index)
+    if vetorizado:
+        return _construtivo_vetorizado(grafo, tabela, dist_matrix, node_to_index)
+    inicio, fim, demanda = tabela.inicio, tabela.fim, tabela.demanda
+    deposito = node_to_index[grafo.depot]
+
     solucao = Solucao()
-    servicos_nao_atendidos = set(servicos_info.keys())
+    servicos_nao_atendidos = list(range(len(tabela)))  # índices da tabela, por ordem crescente
     
     while servicos_nao_atendidos:
         # Inicia uma nova rota a partir do depósito
         rota_atual = Rota(grafo.depot, grafo.capacity)
-        no_atual = grafo.depot
+        no_atual = deposito
         
         while True:
             melhor_servico = None
             menor_custo_insercao = float('inf')
+            folga = rota_atual.capacidade_maxima - rota_atual.carga_total
+            linha = dist_matrix[no_atual]
             
             # Encontra o serviço mais próximo do nó atual que pode ser adicionado
-            for (u, v, tipo) in servicos_nao_atendidos:
-                demanda = servicos_info[(u,v,tipo)]['demand']
-                
+            for i in servicos_nao_atendidos:
                 # Custo para ir do nó atual ao início do serviço
-                custo_deslocamento = dist_matrix[node_to_index[no_atual]][node_to_index[u]]
+                custo_deslocamento = linha[inicio[i]]
                 
-                if rota_atual.carga_total + demanda <= rota_atual.capacidade_maxima and custo_deslocamento < menor_custo_insercao:
+                if demanda[i] <= folga and custo_deslocamento < menor_custo_insercao:
                     menor_custo_insercao = custo_deslocamento
-                    melhor_servico = (u, v, tipo)
+                    melhor_servico = i
             
-            if melhor_servico:
+            if melhor_servico is not None:
                 # Adiciona o melhor serviço encontrado à rota
-                u, v, tipo = melhor_servico
-                info = servicos_info[melhor_servico]
-                rota_atual.servicos_realizados.append((info['id'], u, v, tipo))
-                rota_atual.carga_total += info['demand']
+                rota_atual.servicos_realizados.append(tabela.servicos[melhor_servico])
+                rota_atual.carga_total += demanda[melhor_servico]
                 servicos_nao_atendidos.remove(melhor_servico)
-                no_atual = v # Atualiza o nó atual para o final do serviço adicionado
+                no_atual = fim[melhor_servico] # Atualiza o nó atual para o final do serviço adicionado
             else:
                 # Nenhum serviço pode ser adicionado (capacidade ou não há mais serviços)
                 break
         
         # Se a rota não ficou vazia, recalcula seus custos e a adiciona à solução
         if rota_atual.servicos_realizados:
-            rota_atual.recalcular_rota_completa(grafo, servicos_info, dist_matrix, node_to_index)
+            rota_atual.recalcular_rota_completa(grafo, tabela, dist_matrix, node_to_index)
             solucao.adicionar_rota(rota_atual)
             
     solucao.recalcular_custo_solucao()
-    return solucao
\ No newline at end of file
+    return solucao
+
+def _construtivo_vetorizado(grafo, tabela, dist_matrix, node_to_index):
+    """
+    Versão vetorizada do construtivo do vizinho mais próximo.
+
+    Os serviços pendentes são mantidos numa máscara booleana e, a cada passo, o próximo
+    serviço é escolhido com um único 'argmin' sobre a linha de distâncias do nó atual,
+    restrita aos serviços pendentes cuja demanda cabe na capacidade restante. O 'argmin'
+    devolve o primeiro mínimo, o que reproduz o desempate pelo menor ID do laço em Python.
+    """
+    inicio = np.asarray(tabela.inicio, dtype=np.int64)
+    fim = tabela.fim
+    demanda = np.asarray(tabela.demanda, dtype=np.float64)
+    deposito = node_to_index[grafo.depot]
+
+    # Só interessam as colunas dos inícios de serviço e as linhas dos nós onde uma rota
+    # pode estar (depósito e fins de serviço). Com uma matriz NumPy (por exemplo, lida
+    # do cache com 'como_listas=False') isto é uma única indexação; com listas de
+    # listas, as linhas têm de ser convertidas, o que domina o tempo em instâncias pequenas.
+    linhas = sorted(set(fim) | {deposito})
+    posicao_linha = {no: k for k, no in enumerate(linhas)}
+    if isinstance(dist_matrix, np.ndarray):
+        distancias = np.asarray(dist_matrix[np.ix_(linhas, inicio)], dtype=np.float64)
+    else:
+        distancias = np.array([dist_matrix[r] for r in linhas], dtype=np.float64)[:, inicio]
+
+    pendentes = np.ones(len(tabela), dtype=bool)
+    restantes = len(tabela)
+    solucao = Solucao()
+
+    while restantes:
+        # Inicia uma nova rota a partir do depósito
+        rota_atual = Rota(grafo.depot, grafo.capacity)
+        no_atual = deposito
+
+        while restantes:
+            folga = rota_atual.capacidade_maxima - rota_atual.carga_total
+            candidatos = np.where(pendentes & (demanda <= folga), distancias[posicao_linha[no_atual]], np.inf)
+            melhor_servico = int(np.argmin(candidatos))
+            if candidatos[melhor_servico] == np.inf:
+                # Nenhum serviço pode ser adicionado (capacidade ou serviços inalcançáveis)
+                break
+
+            rota_atual.servicos_realizados.append(tabela.servicos[melhor_servico])
+            rota_atual.carga_total += tabela.demanda[melhor_servico]
+            pendentes[melhor_servico] = False
+            restantes -= 1
+            no_atual = fim[melhor_servico]
+
+        if rota_atual.servicos_realizados:
+            rota_atual.recalcular_rota_completa(grafo, tabela, dist_matrix, node_to_index)
+            solucao.adicionar_rota(rota_atual)
+
+    solucao.recalcular_custo_solucao()
+    return solucao
+
+
+def tour_gigante(grafo, tabela, dist_matrix, node_to_index, rng=None, tamanho_rcl=1):
+    """
+    Constrói um único "tour gigante" com todos os serviços, ignorando a capacidade:
+    partindo do depósito, visita sempre o serviço pendente mais próximo (desempate
+    pelo menor ID).
+
+    Com um gerador 'rng' (random.Random) e 'tamanho_rcl' > 1, o próximo serviço é
+    sorteado entre os 'tamanho_rcl' pendentes mais próximos (lista restrita de
+    candidatos), o que gera tours diferentes para sementes diferentes.
+
+    Returns:
+        list: Índices da tabela de serviços, pela ordem de visita.
+    """
+    inicio, fim = tabela.inicio, tabela.fim
+    pendentes = list(range(len(tabela)))
+    no_atual = node_to_index[grafo.depot]
+    tour = []
+    aleatorio = rng is not None and tamanho_rcl > 1
+
+    while pendentes:
+        linha = dist_matrix[no_atual]
+        if aleatorio:
+            candidatos = heapq.nsmallest(tamanho_rcl, pendentes, key=lambda i: linha[inicio[i]])
+            melhor_servico = rng.choice(candidatos)
+        else:
+            melhor_servico = min(pendentes, key=lambda i: linha[inicio[i]])
+        tour.append(melhor_servico)
+        pendentes.remove(melhor_servico)
+        no_atual = fim[melhor_servico]
+    return tour
+
+
+def split_linear(tour, tabela, dist_matrix, deposito, capacidade):
+    """
+    Divide o tour gigante em rotas que respeitam a capacidade, com custo total mínimo
+    para a ordem dada (algoritmo Split de Vidal, em tempo linear).
+
+    Com o tour t1..tn, o custo de uma rota que atende t(i+1)..tj é
+        d(depósito, t(i+1)) + c(i+1) - P(i+1) + P(j) + d(tj, depósito),
+    onde P(j) é o custo acumulado (serviços e ligações) do tour até tj. O custo separa-se
+    numa parte que só depende de i e noutra que só depende de j, pelo que o melhor
+    predecessor de j é o mínimo de f(i) = p(i) + d(depósito, t(i+1)) + c(i+1) - P(i+1)
+    sobre a janela de i cuja carga cabe no veículo. Como essa janela só avança, o
+    mínimo é mantido numa fila monótona (deque), e cada i entra e sai uma única vez.
+
+    Args:
+        tour (list): Índices da tabela de serviços, pela ordem do tour.
+        tabela (TabelaServicos): Tabela densa de serviços.
+        dist_matrix (list[list]): Matriz de caminhos mínimos pré-calculada.
+        deposito (int): Índice de matriz do depósito.
+        capacidade (int): Capacidade dos veículos.
+
+    Returns:
+        list[list]: As rotas, cada uma como lista de índices da tabela de serviços.
+    """
+    n = len(tour)
+    inicio, fim, demanda, custo = tabela.inicio, tabela.fim, tabela.demanda, tabela.custo
+
+    # Somas de prefixo (posições 1..n) da carga e do custo acumulado do tour.
+    carga = [0] * (n + 1)
+    acumulado = [0] * (n + 1)
+    for k in range(1, n + 1):
+        s = tour[k - 1]
+        carga[k] = carga[k - 1] + demanda[s]
+        ligacao = dist_matrix[fim[tour[k - 2]]][inicio[s]] if k > 1 else 0
+        acumulado[k] = acumulado[k - 1] + ligacao + custo[s]
+
+    def f(i):
+        s = tour[i]
+        return potencial[i] + dist_matrix[deposito][inicio[s]] + custo[s] - acumulado[i + 1]
+
+    potencial = [0] + [float('inf')] * n
+    predecessor = [0] * (n + 1)
+    valores = [0] * (n + 1)
+    fila = deque()
+
+    for j in range(1, n + 1):
+        # O corte imediatamente antes de tj passa a ser candidato.
+        valores[j - 1] = f(j - 1)
+        while fila and valores[fila[-1]] >= valores[j - 1]:
+            fila.pop()
+        fila.append(j - 1)
+
+        # Remove os cortes cuja rota até tj excede a capacidade (a janela só avança).
+        while fila and carga[j] - carga[fila[0]] > capacidade:
+            fila.popleft()
+        if not fila:
+            raise ValueError(f"O serviço {tabela.servicos[tour[j - 1]][0]} tem demanda maior do que a capacidade do veículo.")
+
+        i = fila[0]
+        potencial[j] = valores[i] + acumulado[j] + dist_matrix[fim[tour[j - 1]]][deposito]
+        predecessor[j] = i
+
+    rotas = []
+    j = n
+    while j > 0:
+        i = predecessor[j]
+        rotas.append(tour[i:j])
+        j = i
+    rotas.reverse()
+    return rotas
+
+
+def construtivo_split(grafo, servicos_info, dist_matrix, node_to_index, rng=None, tamanho_rcl=1):
+    """
+    Construtivo "route-first, cluster-second": constrói um tour gigante com todos os
+    serviços ('tour_gigante') e divide-o de forma ótima em rotas viáveis
+    ('split_linear'). Evita a cauda de rotas quase vazias do construtivo guloso.
+    'servicos_info' pode ser o dicionário de 'preparar_servicos' ou uma 'TabelaServicos';
+    'rng' e 'tamanho_rcl' tornam o tour aleatório (ver 'tour_gigante').
+    """
+    tabela = TabelaServicos.de(servicos_info, node_to_index)
+    deposito = node_to_index[grafo.depot]
+    tour = tour_gigante(grafo, tabela, dist_matrix, node_to_index, rng, tamanho_rcl)
+
+    solucao = Solucao()
+    for indices in split_linear(tour, tabela, dist_matrix, deposito, grafo.capacity):
+        rota = Rota(grafo.depot, grafo.capacity)
+        rota.servicos_realizados = [tabela.servicos[i] for i in indices]
+        rota.recalcular_rota_completa(grafo, tabela, dist_matrix, node_to_index)
+        solucao.adicionar_rota(rota)
+
+    solucao.recalcular_custo_solucao()
+    return solucao
@@ -0,0 +1,130 @@
+# ARQUIVO: telemetria.py
+"""
+Instrumentação opcional do pipeline: tempos por fase e contadores da busca.
+
+Desativada por padrão. Quando ativa ('ativar()'), regista:
+    - por fase ('with fase(nome):'): número de chamadas, tempo de relógio e tempo de CPU;
+    - contadores ('contar(nome, n)'): operações de heap do Dijkstra, movimentos avaliados,
+      movimentos rejeitados pela capacidade, iterações...;
+    - melhorias aplicadas ('registar_melhoria(origem, delta)'), com o instante e o delta.
+
+Para que o custo seja quase nulo quando está desativada, os laços internos não chamam
+este módulo: acumulam contagens em variáveis locais e só as comunicam no fim, depois de
+testar 'telemetria.ATIVA' (o atributo deve ser lido através do módulo, e não importado
+com 'from telemetria import ATIVA', para refletir o estado atual).
+
+O estado é global ao processo; no executor em lote cada instância corre num processo
+próprio e escreve o seu traço JSON com 'guardar' (se o processo for terminado por
+timeout, é o processo principal que escreve um traço vazio, com 'traco_vazio').
+"""
+
+# Imports necessários
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+# Número máximo de eventos de melhoria guardados individualmente (os agregados por
+# origem continuam a ser atualizados depois disso).
+MAX_EVENTOS = 100_000
+
+ATIVA = False
+_inicio = None
+_fases = {}
+_contadores = {}
+_melhorias = {}
+_eventos = []
+_NULO = nullcontext()
+
+
+def reiniciar():
+    """ Apaga tudo o que foi registado e reinicia o relógio de referência. """
+    global _inicio
+    _inicio = time.perf_counter()
+    _fases.clear()
+    _contadores.clear()
+    _melhorias.clear()
+    _eventos.clear()
+
+
+def ativar():
+    """ Ativa a telemetria (e reinicia os registos). """
+    global ATIVA
+    reiniciar()
+    ATIVA = True
+
+
+def desativar():
+    global ATIVA
+    ATIVA = False
+
+
+@contextmanager
+def _medir_fase(nome):
+    parede, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        registo = _fases.setdefault(nome, {'chamadas': 0, 'parede': 0.0, 'cpu': 0.0})
+        registo['chamadas'] += 1
+        registo['parede'] += time.perf_counter() - parede
+        registo['cpu'] += time.process_time() - cpu
+
+
+def fase(nome):
+    """
+    Gestor de contexto que mede o tempo de relógio e de CPU de uma fase. Com a
+    telemetria desativada, devolve um contexto nulo partilhado.
+    """
+    return _medir_fase(nome) if ATIVA else _NULO
+
+
+def contar(nome, quantidade=1):
+    """ Soma 'quantidade' ao contador 'nome'. """
+    if ATIVA:
+        _contadores[nome] = _contadores.get(nome, 0) + quantidade
+
+
+def registar_melhoria(origem, delta):
+    """ Regista uma melhoria aplicada por 'origem' (vizinhança, metaheurística...). """
+    if not ATIVA:
+        return
+    agregado = _melhorias.setdefault(origem, {'quantidade': 0, 'delta_total': 0})
+    agregado['quantidade'] += 1
+    agregado['delta_total'] += delta
+    if len(_eventos) < MAX_EVENTOS:
+        _eventos.append((round(time.perf_counter() - _inicio, 6), origem, delta))
+
+
+def exportar(**metadados):
+    """
+    Retorna o traço registado como um dicionário serializável em JSON, com as chaves
+    'metadados', 'fases', 'contadores' e 'melhorias' ('por_origem' e 'eventos', estes
+    como listas [instante em segundos, origem, delta]).
+    """
+    return {
+        'metadados': metadados,
+        'fases': {nome: dict(registo) for nome, registo in _fases.items()},
+        'contadores': dict(_contadores),
+        'melhorias': {
+            'por_origem': {origem: dict(agregado) for origem, agregado in _melhorias.items()},
+            'eventos': [list(evento) for evento in _eventos],
+        },
+    }
+
+
+def traco_vazio(**metadados):
+    """ Retorna um traço sem registos, com a mesma estrutura do de 'exportar'. """
+    return {
+        'metadados': metadados,
+        'fases': {},
+        'contadores': {},
+        'melhorias': {'por_origem': {}, 'eventos': []},
+    }
+
+
+def guardar(caminho, traco=None, **metadados):
+    """ Escreve num ficheiro JSON o traço dado ou, por padrão, o registado neste processo. """
+    if traco is None:
+        traco = exportar(**metadados)
+    with open(caminho, 'w') as f:
+        json.dump(traco, f, indent=1)
@@ -0,0 +1,195 @@
+# ARQUIVO: validador.py
+"""
+Validação completa das soluções escritas ('sol-*.dat').
+
+Para cada solução, lê todas as linhas de rota (ver 'solucao.ler_ficheiro_solucao') e
+confronta-as com a instância: cada serviço de 'preparar_servicos' tem de ser atendido
+exatamente uma vez, com as extremidades corretas, nenhuma rota pode exceder a
+capacidade e a carga, o custo e o número de visitas declarados (por rota e no
+cabeçalho) têm de coincidir com os recalculados a partir da matriz de caminhos
+mínimos. As instâncias são validadas em paralelo e, com '--cache', as matrizes são
+lidas do cache de caminhos mínimos em vez de recalculadas.
+
+Exemplo:
+    python validador.py solucoes --entrada dados/MCGRP --cache .cache_caminhos --saida validacao.json
+"""
+
+# Imports necessários
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+
+from instancia import parse_instance
+from grafo import CustomGraph
+from solucao import TabelaServicos, preparar_servicos, ler_ficheiro_solucao
+from cache_caminhos import CacheCaminhos
+
+INF = float('inf')
+
+
+def validar_solucao(dados, tabela, dist_matrix, node_to_index, deposito_id, capacidade):
+    """
+    Valida uma solução lida por 'ler_ficheiro_solucao' contra a instância.
+
+    O custo de cada serviço de aresta é calculado no sentido em que aparece no
+    ficheiro, pelo que uma aresta percorrida ao contrário é aceite.
+
+    Args:
+        dados (dict): Solução devolvida por 'ler_ficheiro_solucao'.
+        tabela (TabelaServicos): Serviços da instância.
+        dist_matrix: Matriz de distâncias ('dist_matrix[i][j]', índices de 'node_to_index').
+        node_to_index (dict): Nó -> índice da matriz.
+        deposito_id (int): Nó do depósito.
+        capacidade (int): Capacidade dos veículos.
+
+    Returns:
+        tuple: (erros, custo_recalculado), com 'erros' uma lista de mensagens (vazia se a
+        solução for válida).
+    """
+    erros = []
+    num_servicos = len(tabela)
+    atendimentos = [0] * num_servicos
+    deposito = node_to_index[deposito_id]
+    custo_solucao = 0
+
+    if dados['num_rotas'] != len(dados['rotas']):
+        erros.append(f"cabeçalho declara {dados['num_rotas']} rotas, o ficheiro tem {len(dados['rotas'])}")
+
+    for rota in dados['rotas']:
+        nome = f"rota {rota['indice']}"
+        carga = 0
+        custo = 0
+        anterior = deposito
+        for sid, u, v in rota['servicos']:
+            i = sid - 1
+            if not 0 <= i < num_servicos:
+                erros.append(f"{nome}: serviço {sid} não existe (a instância tem {num_servicos})")
+                continue
+            atendimentos[i] += 1
+            extremidades = (tabela.u[i], tabela.v[i])
+            if (u, v) != extremidades and not (tabela.tipo[i] == 'E' and (v, u) == extremidades):
+                erros.append(f"{nome}: serviço {sid} declarado como ({u},{v}), esperado {extremidades}")
+                continue
+            inicio, fim = node_to_index[u], node_to_index[v]
+            custo += dist_matrix[anterior][inicio] + tabela.custo[i]
+            carga += tabela.demanda[i]
+            anterior = fim
+        custo += dist_matrix[anterior][deposito]
+        custo_solucao += custo
+
+        if custo == INF:
+            erros.append(f"{nome}: contém um deslocamento entre nós não alcançáveis")
+        elif int(custo) != int(rota['custo']):
+            erros.append(f"{nome}: custo declarado {int(rota['custo'])}, recalculado {int(custo)}")
+        if carga > capacidade:
+            erros.append(f"{nome}: carga {carga} excede a capacidade {capacidade}")
+        if int(carga) != int(rota['carga']):
+            erros.append(f"{nome}: carga declarada {int(rota['carga'])}, recalculada {int(carga)}")
+        if rota['visitas'] != len(rota['servicos']) + 2:
+            erros.append(f"{nome}: declara {rota['visitas']} visitas, tem {len(rota['servicos']) + 2}")
+
+    em_falta = [i + 1 for i, n in enumerate(atendimentos) if n == 0]
+    repetidos = [i + 1 for i, n in enumerate(atendimentos) if n > 1]
+    if em_falta:
+        erros.append(f"{len(em_falta)} serviços não atendidos: {em_falta[:10]}{' ...' if len(em_falta) > 10 else ''}")
+    if repetidos:
+        erros.append(f"{len(repetidos)} serviços atendidos mais de uma vez: "
+                     f"{repetidos[:10]}{' ...' if len(repetidos) > 10 else ''}")
+    if custo_solucao != INF and int(custo_solucao) != int(dados['custo']):
+        erros.append(f"cabeçalho declara custo {int(dados['custo'])}, a soma das rotas é {int(custo_solucao)}")
+    return erros, custo_solucao
+
+
+def validar_ficheiro(caminho_solucao, caminho_instancia, cache=None, apenas_terminais=True):
+    """
+    Lê a instância e a solução e valida-a (ver 'validar_solucao'). Por padrão só é
+    calculada a matriz entre os nós terminais, que é tudo o que a validação consulta.
+
+    Returns:
+        dict: {'instancia', 'estado' ('ok', 'invalido' ou 'erro'), 'custo_declarado',
+        'custo_recalculado', 'erros'}.
+    """
+    nome = os.path.splitext(os.path.basename(caminho_instancia))[0]
+    resultado = {'instancia': nome, 'estado': 'erro', 'custo_declarado': None, 'custo_recalculado': None, 'erros': []}
+    try:
+        dados = ler_ficheiro_solucao(caminho_solucao)
+        resultado['custo_declarado'] = dados['custo']
+        parsed_data = parse_instance(caminho_instancia)
+        g = CustomGraph(parsed_data)
+        if cache is not None:
+            dist, _, node_to_index, _ = cache.obter(caminho_instancia, g, apenas_terminais=apenas_terminais)
+        else:
+            dist, _, node_to_index, _ = g.all_pairs_dijkstra(apenas_terminais=apenas_terminais)
+        tabela = TabelaServicos(preparar_servicos(parsed_data), node_to_index)
+        erros, custo = validar_solucao(dados, tabela, dist, node_to_index, g.depot, g.capacity)
+    except (OSError, ValueError, KeyError) as e:
+        resultado['erros'].append(f"{type(e).__name__}: {e}")
+        return resultado
+
+    resultado.update(estado='invalido' if erros else 'ok', custo_recalculado=custo, erros=erros)
+    return resultado
+
+
+def _validar_tarefa(tarefa):
+    """ Trabalho de cada processo: valida um par (solução, instância). """
+    caminho_solucao, caminho_instancia, diretorio_cache, apenas_terminais = tarefa
+    cache = CacheCaminhos(diretorio_cache) if diretorio_cache else None
+    return validar_ficheiro(caminho_solucao, caminho_instancia, cache, apenas_terminais)
+
+
+def validar_diretorio(dir_solucoes, dir_instancias, processos=None, diretorio_cache=None, apenas_terminais=True):
+    """
+    Valida em paralelo todas as soluções 'sol-*.dat' de 'dir_solucoes', procurando a
+    instância correspondente em 'dir_instancias'. As instâncias maiores são
+    distribuídas primeiro e os resultados são produzidos à medida que ficam prontos.
+    """
+    tarefas = []
+    for caminho_solucao in glob.glob(os.path.join(dir_solucoes, 'sol-*.dat')):
+        nome = os.path.basename(caminho_solucao)[len('sol-'):]
+        caminho_instancia = os.path.join(dir_instancias, nome)
+        tamanho = os.path.getsize(caminho_instancia) if os.path.exists(caminho_instancia) else 0
+        tarefas.append((tamanho, (caminho_solucao, caminho_instancia, diretorio_cache, apenas_terminais)))
+    tarefas = [tarefa for _, tarefa in sorted(tarefas, key=lambda item: (-item[0], item[1][0]))]
+
+    processos = processos or os.cpu_count() or 1
+    if processos == 1:
+        yield from map(_validar_tarefa, tarefas)
+        return
+    with multiprocessing.Pool(processos) as pool:
+        yield from pool.imap_unordered(_validar_tarefa, tarefas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Valida as soluções de uma pasta contra as instâncias.')
+    parser.add_argument('solucoes', nargs='?', default='solucoes', help="Pasta com as soluções 'sol-*.dat'.")
+    parser.add_argument('--entrada', default='dados/MCGRP', help='Pasta com as instâncias (.dat).')
+    parser.add_argument('--processos', type=int, default=None, help='Número de processos (padrão: número de núcleos).')
+    parser.add_argument('--cache', default=None, help='Pasta do cache de caminhos mínimos (desativado por padrão).')
+    parser.add_argument('--completa', action='store_true',
+                        help='Usa a matriz completa em vez da matriz entre terminais (partilha o cache do lote sem --terminais).')
+    parser.add_argument('--saida', default=None, metavar='JSON', help='Escreve o resultado de cada instância neste ficheiro.')
+    args = parser.parse_args(argv)
+
+    resultados = []
+    for resultado in validar_diretorio(args.solucoes, args.entrada, args.processos, args.cache, not args.completa):
+        resultados.append(resultado)
+        if resultado['estado'] != 'ok':
+            print(f"❌ {resultado['instancia']} ({resultado['estado']}):")
+            for erro in resultado['erros']:
+                print(f"    - {erro}")
+
+    resultados.sort(key=lambda r: r['instancia'])
+    resumo = {estado: sum(r['estado'] == estado for r in resultados) for estado in ('ok', 'invalido', 'erro')}
+    print(f"\n{len(resultados)} soluções: {resumo['ok']} válidas, {resumo['invalido']} inválidas, {resumo['erro']} erros.")
+
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump({'resumo': resumo, 'instancias': resultados}, f, indent=1)
+    return 0 if resumo['ok'] == len(resultados) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())